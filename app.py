@@ -1,27 +1,40 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, send_file
+from flask import Flask, render_template, request, redirect, url_for, flash, session, send_file, abort, current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user, UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-from xhtml2pdf import pisa
 from io import BytesIO
 from datetime import datetime
-from flask_migrate import Migrate
+from metricas import init_metricas, medir_pdf
+from perfilado import init_perfilado
+from cache_fragmentos import crear_cache_fragmentos, init_bytecode_cache, version_de
+from assets import init_assets
+from outbox import init_outbox
+from archivo import Archivador, init_archivo
+from resumen_ventas import ResumenVentas, init_resumen_ventas
+from reservas import InventarioOcupado, MotorReservas, init_reservas
+from validadores import con_validadores, hacer_etag, huella_plantillas, no_modificado
+import click
 import os
 
-# ---------------------------
-# Configuración Flask
-# ---------------------------
-app = Flask(__name__)
-app.secret_key = os.urandom(24)  # clave más segura
+# xhtml2pdf (~0.6 s) y Flask-Migrate/alembic (~0.1 s) no se importan aquí:
+# solo los necesitan factura() y el comando "flask db". Ver create_app().
 
 # ---------------------------
-# Configuración SQLAlchemy
+# Extensiones (se enlazan a cada app en create_app)
 # ---------------------------
-app.config['SQLALCHEMY_DATABASE_URI'] = 'mysql+pymysql://root:@localhost/desarrollo_web'
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+db = SQLAlchemy()
+login_manager = LoginManager()
+login_manager.login_view = 'login'
 
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+# Las vistas se declaran con @ruta y create_app() las registra en cada app
+# con el mismo nombre de endpoint que tendrían con @app.route.
+RUTAS = []
+
+def ruta(regla, **opciones):
+    def registrar(vista):
+        RUTAS.append((regla, vista, opciones))
+        return vista
+    return registrar
 
 # ---------------------------
 # Modelos
@@ -50,13 +63,84 @@ class DetalleCompra(db.Model):
     precio = db.Column(db.Float, nullable=False)
     imagen = db.Column(db.String(100), nullable=False)
 
+# Archivo en frío: compras antiguas movidas por "flask archivo mover" (ver archivo.py)
+class CompraArchivada(db.Model):
+    __tablename__ = 'compras_archivo'
+    id_compra = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id_usuario'), nullable=False, index=True)
+    fecha = db.Column(db.DateTime)
+    total = db.Column(db.Float, nullable=False)
+
+class DetalleCompraArchivado(db.Model):
+    __tablename__ = 'detalle_compra_archivo'
+    id_detalle = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    id_compra = db.Column(db.Integer, db.ForeignKey('compras_archivo.id_compra'), nullable=False, index=True)
+    id_producto = db.Column(db.Integer, nullable=False)
+    nombre_producto = db.Column(db.String(100), nullable=False)
+    cantidad = db.Column(db.Integer, nullable=False)
+    precio = db.Column(db.Float, nullable=False)
+    imagen = db.Column(db.String(100), nullable=False)
+
+archivo = Archivador(db, Compra, DetalleCompra, CompraArchivada, DetalleCompraArchivado)
+
+# Resúmenes de ventas: los mantiene finalizar_compra (ver resumen_ventas.py)
+class VentaDiaria(db.Model):
+    __tablename__ = 'ventas_diarias'
+    fecha = db.Column(db.Date, primary_key=True)
+    compras = db.Column(db.Integer, nullable=False, default=0)
+    unidades = db.Column(db.Integer, nullable=False, default=0)
+    ingresos = db.Column(db.Float, nullable=False, default=0)
+
+class VentaProducto(db.Model):
+    __tablename__ = 'ventas_por_producto'
+    id_producto = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    nombre_producto = db.Column(db.String(100), nullable=False)
+    compras = db.Column(db.Integer, nullable=False, default=0)
+    unidades = db.Column(db.Integer, nullable=False, default=0, index=True)
+    ingresos = db.Column(db.Float, nullable=False, default=0)
+
+class VentaUsuario(db.Model):
+    __tablename__ = 'ventas_por_usuario'
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id_usuario'), primary_key=True, autoincrement=False)
+    compras = db.Column(db.Integer, nullable=False, default=0)
+    unidades = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0)
+    ultima_compra = db.Column(db.DateTime)
+
+# Outbox: eventos escritos en la transacción de la compra (ver outbox.py)
+class EventoOutbox(db.Model):
+    __tablename__ = 'outbox_eventos'
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    id_agregado = db.Column(db.Integer, nullable=False)
+    datos = db.Column(db.Text, nullable=False)
+    creado = db.Column(db.DateTime, nullable=False)
+    publicado = db.Column(db.DateTime, index=True)
+
+resumen_ventas = ResumenVentas(db, Compra, DetalleCompra, VentaDiaria, VentaProducto, VentaUsuario,
+                               archivo=(CompraArchivada, DetalleCompraArchivado))
+
+# Stock del catálogo web y reservas de carrito (ver reservas.py)
+class StockProducto(db.Model):
+    __tablename__ = 'stock_productos'
+    id_producto = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    reservada = db.Column(db.Integer, nullable=False, default=0)
+
+class ReservaStock(db.Model):
+    __tablename__ = 'reservas_stock'
+    __table_args__ = (db.UniqueConstraint('id_usuario', 'id_producto'),)
+    id = db.Column(db.Integer, primary_key=True)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id_usuario'), nullable=False)
+    id_producto = db.Column(db.Integer, nullable=False)
+    cantidad = db.Column(db.Integer, nullable=False)
+    expira = db.Column(db.DateTime, nullable=False, index=True)
+
+reservas = MotorReservas(db, StockProducto, ReservaStock)
+
 # ---------------------------
 # Flask-Login
 # ---------------------------
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
-
 @login_manager.user_loader
 def load_user(user_id):
     return Usuario.query.get(int(user_id))
@@ -71,15 +155,18 @@ CATALOGO = [
     {"id_producto": 4, "nombre": "Galleta Sweet Cloud", "precio": 2.8, "imagen": "galleta4.png"},
     {"id_producto": 5, "nombre": "Galleta Lovely Cupcake", "precio": 3.5, "imagen": "galleta5.png"},
 ]
+# Cambia cada vez que cambia el contenido del catálogo; invalida la grilla cacheada
+CATALOGO_VERSION = version_de(CATALOGO)
+IDIOMAS = ['es', 'en']
 
 # ---------------------------
 # Rutas principales
 # ---------------------------
-@app.route('/')
+@ruta('/')
 def index():
     return redirect(url_for('login'))
 
-@app.route('/register', methods=['GET', 'POST'])
+@ruta('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         nombre = request.form['nombre']
@@ -100,7 +187,7 @@ def register():
 
     return render_template('register.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@ruta('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         email = request.form['email']
@@ -115,22 +202,36 @@ def login():
 
     return render_template('login.html')
 
-@app.route('/logout')
+@ruta('/logout')
 @login_required
 def logout():
+    reservas.liberar_todo(current_user.id)
     logout_user()
     session.pop('carrito', None)
     return redirect(url_for('login'))
 
-@app.route('/catalogo')
+@ruta('/catalogo')
 @login_required
 def catalogo():
-    return render_template("catalogo.html", productos=CATALOGO)
+    clave = _clave_catalogo()
+    etag = hacer_etag(*clave, huella_plantillas(current_app, "catalogo.html", "_catalogo_grid.html", "base.html"))
+    respuesta = no_modificado(etag)
+    if respuesta is not None:
+        return respuesta
+    return con_validadores(render_template("catalogo.html", grilla=_grilla_catalogo(clave)), etag)
+
+def _clave_catalogo():
+    idioma = request.accept_languages.best_match(IDIOMAS, default=IDIOMAS[0])
+    return ("catalogo", CATALOGO_VERSION, idioma, request.script_root)
+
+def _grilla_catalogo(clave):
+    return current_app.extensions['fragmentos'].obtener(
+        clave, lambda: render_template("_catalogo_grid.html", productos=CATALOGO))
 
 # ---------------------------
 # Carrito
 # ---------------------------
-@app.route('/carrito')
+@ruta('/carrito')
 @login_required
 def ver_carrito():
     carrito = session.get('carrito', {})
@@ -153,7 +254,7 @@ def ver_carrito():
 
     return render_template('carrito.html', productos=productos, total=total)
 
-@app.route('/agregar/<int:producto_id>', methods=['POST'])
+@ruta('/agregar/<int:producto_id>', methods=['POST'])
 @login_required
 def agregar_al_carrito(producto_id):
     producto = next((p for p in CATALOGO if p["id_producto"] == producto_id), None)
@@ -161,6 +262,10 @@ def agregar_al_carrito(producto_id):
         flash("Producto no encontrado", "danger")
         return redirect(url_for('catalogo'))
 
+    if not reservas.reservar(current_user.id, producto_id):
+        flash(f'No queda stock de {producto["nombre"]}', 'warning')
+        return redirect(url_for('catalogo'))
+
     carrito = session.get('carrito', {})
     id_str = str(producto_id)
     carrito[id_str] = carrito.get(id_str, 0) + 1
@@ -169,7 +274,7 @@ def agregar_al_carrito(producto_id):
     flash(f'{producto["nombre"]} se agregó a tu canasta 🛒', 'success')
     return redirect(url_for('catalogo'))
 
-@app.route('/actualizar_carrito/<int:producto_id>', methods=['POST'])
+@ruta('/actualizar_carrito/<int:producto_id>', methods=['POST'])
 @login_required
 def actualizar_carrito(producto_id):
     accion = request.form['accion']
@@ -177,16 +282,21 @@ def actualizar_carrito(producto_id):
     id_str = str(producto_id)
     if id_str in carrito:
         if accion == 'sumar':
-            carrito[id_str] += 1
+            if reservas.reservar(current_user.id, producto_id):
+                carrito[id_str] += 1
+            else:
+                flash('No queda más stock de ese producto', 'warning')
         elif accion == 'restar' and carrito[id_str] > 1:
+            reservas.liberar(current_user.id, producto_id, 1)
             carrito[id_str] -= 1
     session['carrito'] = carrito
     session.modified = True
     return redirect(url_for('ver_carrito'))
 
-@app.route('/eliminar/<int:producto_id>')
+@ruta('/eliminar/<int:producto_id>')
 @login_required
 def eliminar_del_carrito(producto_id):
+    reservas.liberar(current_user.id, producto_id)
     carrito = session.get('carrito', {})
     carrito.pop(str(producto_id), None)
     session['carrito'] = carrito
@@ -197,7 +307,7 @@ def eliminar_del_carrito(producto_id):
 # ---------------------------
 # Finalizar compra
 # ---------------------------
-@app.route('/finalizar_compra', methods=['POST'])
+@ruta('/finalizar_compra', methods=['POST'])
 @login_required
 def finalizar_compra():
     carrito = session.get('carrito', {})
@@ -210,7 +320,18 @@ def finalizar_compra():
         for id_str, cantidad in carrito.items()
     )
 
-    num_facturas_usuario = Compra.query.filter_by(id_usuario=current_user.id).count()
+    # Las reservas se convierten en descuentos de stock dentro de esta misma
+    # transacción; si algo no alcanza, no se guarda nada de la compra.
+    pedido = {int(i): int(c) for i, c in carrito.items()}
+    faltantes = reservas.confirmar(current_user.id, pedido)
+    if faltantes:
+        db.session.rollback()
+        nombres = ', '.join(p["nombre"] for p in CATALOGO if p["id_producto"] in faltantes)
+        flash(f'No hay stock suficiente de: {nombres}', 'danger')
+        return redirect(url_for('ver_carrito'))
+
+    num_facturas_usuario = (Compra.query.filter_by(id_usuario=current_user.id).count()
+                            + CompraArchivada.query.filter_by(id_usuario=current_user.id).count())
     num_factura_usuario = num_facturas_usuario + 1
 
     nueva_compra = Compra(
@@ -219,8 +340,9 @@ def finalizar_compra():
         fecha=datetime.utcnow()
     )
     db.session.add(nueva_compra)
-    db.session.commit()
+    db.session.flush()  # asigna id_compra sin cerrar la transacción
 
+    detalles = []
     for id_str, cantidad in carrito.items():
         producto = next((p for p in CATALOGO if p["id_producto"] == int(id_str)), None)
         if producto:
@@ -233,7 +355,41 @@ def finalizar_compra():
                 imagen=producto["imagen"]
             )
             db.session.add(detalle)
-    db.session.commit()
+            detalles.append(detalle)
+    # Stock, compra, detalle, resúmenes y evento se confirman juntos o no se confirma nada
+    resumen_ventas.registrar(nueva_compra, detalles)
+    current_app.extensions['outbox'].publicar('compra_finalizada', nueva_compra.id_compra, {
+        'id_compra': nueva_compra.id_compra,
+        'id_usuario': nueva_compra.id_usuario,
+        'fecha': nueva_compra.fecha.isoformat(),
+        'total': nueva_compra.total,
+        'detalles': [{'id_producto': d.id_producto, 'nombre_producto': d.nombre_producto,
+                      'cantidad': d.cantidad, 'precio': d.precio} for d in detalles],
+    })
+    # El inventario de consola (si está vinculado) se descuenta antes de
+    # confirmar; si la compra no llega a guardarse, se le devuelven las unidades.
+    try:
+        descontado = reservas.descontar_inventario(pedido)
+    except InventarioOcupado:
+        # La consola tiene el inventario bloqueado: no se retienen las filas
+        # de stock esperándola, se suelta todo y se pide reintentar.
+        db.session.rollback()
+        reservas.liberar_todo(current_user.id)
+        flash('El depósito está ocupado, inténtalo de nuevo en unos segundos', 'warning')
+        return redirect(url_for('ver_carrito'))
+    if not descontado:
+        db.session.rollback()
+        try:
+            reservas.sincronizar_inventario()
+        except InventarioOcupado:
+            pass  # lo corrige el próximo barrido
+        flash('No hay stock suficiente en el depósito', 'danger')
+        return redirect(url_for('ver_carrito'))
+    try:
+        db.session.commit()
+    except Exception:
+        reservas.devolver_inventario(pedido)
+        raise
 
     session.pop('carrito')
     flash(f'Compra finalizada con éxito. Factura #{num_factura_usuario} - Total: ${total:.2f}', 'success')
@@ -242,44 +398,151 @@ def finalizar_compra():
 # ---------------------------
 # Historial de compras
 # ---------------------------
-@app.route('/mis_compras')
+@ruta('/mis_compras')
 @login_required
 def mis_compras():
-    compras = Compra.query.filter_by(id_usuario=current_user.id).order_by(Compra.fecha.asc()).all()
-    detalles = {c.id_compra: DetalleCompra.query.filter_by(id_compra=c.id_compra).all() for c in compras}
+    # Las compras no se modifican: la última (y cuántas hay) identifica la página.
+    # Archivar no la cambia: los ids y el total se mantienen entre ambas tablas.
+    ultima_id, ultima_fecha, cantidad = archivo.resumen_usuario(current_user.id)
+    etag = hacer_etag("mis_compras", current_user.id, ultima_id, cantidad,
+                      huella_plantillas(current_app, "mis_compras.html", "base.html"))
+    respuesta = no_modificado(etag, ultima_fecha)
+    if respuesta is not None:
+        return respuesta
+
+    # Compras calientes y archivadas, con sus detalles en un SELECT ... IN por tabla
+    compras, detalles = archivo.compras_de_usuario(current_user.id)
 
     # Asignar número temporal para cada compra
     for idx, compra in enumerate(compras, start=1):
         compra.numero_usuario = idx
 
-    return render_template('mis_compras.html', compras=compras, detalles=detalles)
+    return con_validadores(render_template('mis_compras.html', compras=compras, detalles=detalles),
+                           etag, ultima_fecha)
 
 # ---------------------------
 # Factura PDF
 # ---------------------------
-@app.route('/factura/<int:id_compra>')
+@ruta('/factura/<int:id_compra>')
 @login_required
 def factura(id_compra):
-    compra = Compra.query.get_or_404(id_compra)
+    # Una factura emitida no cambia: basta el id, el usuario y la plantilla.
+    # Un 304 no revela nada: el ETag solo coincide con lo que ya se descargó.
+    etag = hacer_etag("factura", id_compra, current_user.id, huella_plantillas(current_app, "factura_pdf.html"))
+    respuesta = no_modificado(etag)
+    if respuesta is not None:
+        return respuesta
+
+    compra, modelo_detalle = archivo.buscar_compra(id_compra)
+    if compra is None:
+        abort(404)
     if compra.id_usuario != current_user.id:
         flash("No tienes permiso para ver esta factura", "danger")
         return redirect(url_for('mis_compras'))
 
-    detalles = DetalleCompra.query.filter_by(id_compra=id_compra).all()
+    detalles = modelo_detalle.query.filter_by(id_compra=id_compra).all()
     total = sum(d.precio * d.cantidad for d in detalles)
 
     rendered = render_template('factura_pdf.html', compra=compra, detalles=detalles, usuario=current_user, total=total)
+    from xhtml2pdf import pisa  # perezoso: solo lo paga quien pide una factura
+
     pdf = BytesIO()
-    result = pisa.CreatePDF(rendered, dest=pdf)
+    with medir_pdf():
+        result = pisa.CreatePDF(rendered, dest=pdf)
     if result.err:
         flash("Error al generar PDF", "danger")
         return redirect(url_for('mis_compras'))
 
     pdf.seek(0)
-    return send_file(pdf, as_attachment=True, download_name=f"factura_{compra.id_compra}.pdf", mimetype='application/pdf')
+    return con_validadores(send_file(pdf, as_attachment=True, download_name=f"factura_{compra.id_compra}.pdf",
+                                     mimetype='application/pdf'), etag)
+
+# ---------------------------
+# Fábrica de la app
+# ---------------------------
+class _GrupoPerezoso(click.Group):
+    """Grupo de la CLI que importa el real la primera vez que se usa."""
+
+    def __init__(self, name, cargar, **kwargs):
+        super().__init__(name, **kwargs)
+        self._cargar = cargar
+        self._real = None
+
+    def _grupo(self):
+        if self._real is None:
+            self._real = self._cargar()
+        return self._real
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        # Al invocarse se parsea y ejecuta el grupo real (con sus opciones)
+        return self._grupo().make_context(info_name, args, parent=parent, **extra)
+
+    def list_commands(self, ctx):
+        return self._grupo().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._grupo().get_command(ctx, name)
+
+
+def _cli_migraciones(app):
+    def cargar():
+        from flask_migrate import Migrate
+
+        Migrate(app, db)  # registra el grupo "db" real en app.cli
+        return app.cli.commands['db']
+
+    app.cli.add_command(_GrupoPerezoso('db', cargar, help='Migraciones de la base (Flask-Migrate).'))
+
+
+def create_app(config=None):
+    app = Flask(__name__)
+    app.secret_key = os.urandom(24)  # clave más segura
+
+    # DATABASE_URL permite apuntar a otra base (p. ej. SQLite en benchmarks)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'mysql+pymysql://root:@localhost/desarrollo_web')
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    if config:
+        app.config.update(config)
+
+    # Plantillas compiladas en disco: los workers nuevos no recompilan
+    init_bytecode_cache(app)
+
+    db.init_app(app)
+    _cli_migraciones(app)
+    login_manager.init_app(app)
+
+    # Métricas (GET /metrics) y perfilado SQL (opt-in con PERFILADO_SQL=1)
+    init_metricas(app)
+    init_perfilado(app, db)
+
+    # Assets con hash (python assets.py en cada deploy)
+    init_assets(app)
+
+    app.extensions['fragmentos'] = crear_cache_fragmentos(app)
+    init_archivo(app, archivo)
+    init_outbox(app, db, EventoOutbox)
+    init_resumen_ventas(app, resumen_ventas)
+    init_reservas(app, reservas, CATALOGO)
+
+    for regla, vista, opciones in RUTAS:
+        app.add_url_rule(regla, view_func=vista, **opciones)
+    return app
+
+def precargar(app):
+    """Compila todas las plantillas y renderiza la grilla del catálogo por idioma.
+
+    Lo usa servidor.py en el proceso maestro antes de hacer fork: los workers
+    heredan el resultado ya hecho en lugar de repetirlo cada uno.
+    """
+    for nombre in app.jinja_env.list_templates():
+        app.jinja_env.get_template(nombre)
+    for idioma in IDIOMAS:
+        with app.test_request_context('/catalogo', headers={'Accept-Language': idioma}):
+            _grilla_catalogo(_clave_catalogo())
+    return app
 
 # ---------------------------
 # Ejecutar app
 # ---------------------------
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
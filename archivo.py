@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+"""
+Archivo en frío de compras antiguas
+------------------------------------
+Mueve las compras de más de N días (y su detalle) de compras/detalle_compra
+a compras_archivo/detalle_compra_archivo, en lotes: cada lote copia y borra
+en una sola transacción, así que una compra está siempre en exactamente una
+de las dos tablas. Los ids se conservan, por lo que facturas, resúmenes de
+ventas y eventos de la outbox siguen apuntando a la misma compra.
+
+mis_compras y factura buscan primero en las tablas "calientes" y después en
+el archivo (ver buscar_compra / compras_de_usuario).
+
+Métricas (GET /metrics): filas de cada tabla, refrescadas como mucho cada
+METRICAS_TTL segundos, y compras archivadas por este proceso.
+
+Comandos (flask --app app ...):
+    archivo mover [--dias 365] [--lote 1000]
+    archivo tamanos
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import delete, func, insert, select
+
+from metricas import Contador, Indicador, METRICAS, al_exportar
+
+DIAS_ARCHIVO = 365
+LOTE_ARCHIVO = 1000
+METRICAS_TTL = 300
+
+FILAS_TABLA = Indicador("tabla_filas", "Filas por tabla de compras (calientes y archivo).", ("tabla",))
+COMPRAS_ARCHIVADAS = Contador("archivo_compras_movidas_total", "Compras movidas al archivo.")
+METRICAS.extend([FILAS_TABLA, COMPRAS_ARCHIVADAS])
+
+
+class Archivador:
+    def __init__(self, db, compra, detalle, compra_archivo, detalle_archivo):
+        self.db = db
+        self.Compra = compra
+        self.DetalleCompra = detalle
+        self.CompraArchivo = compra_archivo
+        self.DetalleArchivo = detalle_archivo
+        self._tamanos_en = 0.0
+
+    def tamanos(self):
+        sesion = self.db.session
+        return {m.__tablename__: sesion.query(func.count()).select_from(m).scalar()
+                for m in (self.Compra, self.DetalleCompra, self.CompraArchivo, self.DetalleArchivo)}
+
+    def _publicar_tamanos(self, tamanos):
+        for tabla, filas in tamanos.items():
+            FILAS_TABLA.fijar(filas, tabla)
+        self._tamanos_en = time.monotonic()
+
+    def refrescar_metricas(self, forzar=False):
+        if forzar or time.monotonic() - self._tamanos_en >= METRICAS_TTL:
+            self._publicar_tamanos(self.tamanos())
+
+    def mover_lote(self, limite, lote=LOTE_ARCHIVO):
+        """Archiva hasta `lote` compras anteriores a `limite`; devuelve cuántas movió."""
+        C, D, CA, DA = self.Compra, self.DetalleCompra, self.CompraArchivo, self.DetalleArchivo
+        sesion = self.db.session
+        # Los ids crecen con la fecha: recorrer por id encuentra primero las
+        # viejas sin necesitar un índice sobre fecha.
+        ids = [i for (i,) in sesion.execute(
+            select(C.id_compra).where(C.fecha < limite).order_by(C.id_compra).limit(lote))]
+        if not ids:
+            sesion.rollback()
+            return 0
+        columnas_c = [c.name for c in C.__table__.columns]
+        columnas_d = [c.name for c in D.__table__.columns]
+        sesion.execute(insert(CA.__table__).from_select(
+            columnas_c, select(*C.__table__.columns).where(C.id_compra.in_(ids))))
+        sesion.execute(insert(DA.__table__).from_select(
+            columnas_d, select(*D.__table__.columns).where(D.id_compra.in_(ids))))
+        sesion.execute(delete(D.__table__).where(D.id_compra.in_(ids)))
+        sesion.execute(delete(C.__table__).where(C.id_compra.in_(ids)))
+        sesion.commit()
+        COMPRAS_ARCHIVADAS.inc(len(ids))
+        return len(ids)
+
+    def mover(self, dias=DIAS_ARCHIVO, lote=LOTE_ARCHIVO, al_avanzar=None):
+        """Archiva todas las compras con más de `dias`; devuelve (antes, después, movidas)."""
+        limite = datetime.utcnow() - timedelta(days=dias)
+        antes = self.tamanos()
+        movidas = 0
+        while True:
+            n = self.mover_lote(limite, lote)
+            movidas += n
+            if al_avanzar and n:
+                al_avanzar(movidas)
+            if n < lote:
+                break
+        despues = self.tamanos()
+        self._publicar_tamanos(despues)
+        return antes, despues, movidas
+
+    # ---------------------------
+    # Lecturas con respaldo en el archivo
+    # ---------------------------
+    def buscar_compra(self, id_compra):
+        """(compra, modelo de detalle) buscando en caliente y luego en el archivo."""
+        compra = self.db.session.get(self.Compra, id_compra)
+        if compra is not None:
+            return compra, self.DetalleCompra
+        compra = self.db.session.get(self.CompraArchivo, id_compra)
+        if compra is not None:
+            return compra, self.DetalleArchivo
+        return None, None
+
+    def compras_de_usuario(self, id_usuario):
+        """Compras del usuario (archivo + calientes) por fecha y sus detalles por id_compra."""
+        compras, detalles = [], {}
+        for modelo, modelo_detalle in ((self.CompraArchivo, self.DetalleArchivo),
+                                       (self.Compra, self.DetalleCompra)):
+            propias = modelo.query.filter_by(id_usuario=id_usuario).order_by(modelo.fecha.asc()).all()
+            if not propias:
+                continue
+            # Un solo SELECT ... IN por tabla para todos los detalles
+            ids = [c.id_compra for c in propias]
+            for c in propias:
+                detalles[c.id_compra] = []
+            for d in modelo_detalle.query.filter(modelo_detalle.id_compra.in_(ids)).all():
+                detalles[d.id_compra].append(d)
+            compras.extend(propias)
+        compras.sort(key=lambda c: (c.fecha, c.id_compra))
+        return compras, detalles
+
+    def resumen_usuario(self, id_usuario):
+        """(id máximo, fecha máxima, cantidad) de las compras del usuario en ambas tablas."""
+        maximo, ultima, cantidad = None, None, 0
+        for modelo in (self.Compra, self.CompraArchivo):
+            i, f, n = self.db.session.query(
+                func.max(modelo.id_compra), func.max(modelo.fecha), func.count(modelo.id_compra)
+            ).filter(modelo.id_usuario == id_usuario).one()
+            if i is not None:
+                maximo = i if maximo is None else max(maximo, i)
+                ultima = f if ultima is None else max(ultima, f)
+            cantidad += n
+        return maximo, ultima, cantidad
+
+
+def init_archivo(app, archivador):
+    app.extensions["archivo"] = archivador
+    al_exportar(archivador.refrescar_metricas)
+
+    @app.cli.group("archivo")
+    def grupo():
+        """Archivo en frío de compras antiguas."""
+
+    @grupo.command("mover")
+    @click.option("--dias", default=DIAS_ARCHIVO, show_default=True, help="Antigüedad mínima.")
+    @click.option("--lote", default=LOTE_ARCHIVO, show_default=True, help="Compras por transacción.")
+    def mover(dias, lote):
+        """Mueve las compras antiguas a las tablas de archivo."""
+        antes, despues, movidas = archivador.mover(
+            dias, lote, al_avanzar=lambda n: click.echo(f"  … {n} compras archivadas"))
+        click.echo(f"✔ {movidas} compras archivadas (más de {dias} días)")
+        for tabla in antes:
+            click.echo(f"  {tabla:<24}{antes[tabla]:>10} → {despues[tabla]:>10}")
+
+    @grupo.command("tamanos")
+    def tamanos():
+        """Filas de las tablas calientes y de archivo."""
+        for tabla, filas in archivador.tamanos().items():
+            click.echo(f"  {tabla:<24}{filas:>10}")
+
+    return archivador
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pipeline de assets estáticos
+-----------------------------
+Se ejecuta una vez por deploy y deja en static/dist/:
+- copias de cada archivo con el hash del contenido en el nombre
+  (styles.3fa2c1d9e0.css), servidas con Cache-Control inmutable
+- versiones .gz (y .br si está instalado `brotli`) de los CSS
+- miniaturas de las imágenes de producto en varios anchos, en PNG y WebP
+  (requiere Pillow; sin Pillow solo se copian con hash)
+- manifest.json con el nombre lógico -> archivos generados
+
+En la app, init_assets(app) expone /assets/<archivo> y las funciones de
+plantilla asset_url() e img_srcset(). Si no hay manifest se usa /static tal
+cual, así que en desarrollo no hace falta compilar nada.
+
+Uso:
+    python assets.py            # compila static/ -> static/dist/
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+from flask import abort, request, send_from_directory, url_for
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST = "manifest.json"
+
+EXT_COMPRIMIBLES = (".css", ".js", ".svg")
+EXT_IMAGENES = (".png", ".jpg", ".jpeg")
+ANCHOS_MINIATURA = (160, 320, 640)
+CALIDAD_WEBP = 80
+UN_ANIO = 365 * 24 * 3600
+
+
+# ---------------------------
+# Compilación
+# ---------------------------
+def _hash(datos):
+    return hashlib.sha256(datos).hexdigest()[:10]
+
+
+def _escribir_con_hash(datos, relativo, destino):
+    """Guarda `datos` como <nombre>.<hash><ext> y devuelve la ruta relativa."""
+    base, ext = os.path.splitext(relativo)
+    final = f"{base}.{_hash(datos)}{ext}"
+    ruta = os.path.join(destino, final)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, "wb") as f:
+        f.write(datos)
+    return final.replace(os.sep, "/")
+
+
+def _comprimir(ruta):
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    with gzip.open(ruta + ".gz", "wb", compresslevel=9) as f:
+        f.write(datos)
+    try:
+        import brotli
+    except ImportError:
+        return ["gzip"]
+    with open(ruta + ".br", "wb") as f:
+        f.write(brotli.compress(datos, quality=11))
+    return ["gzip", "br"]
+
+
+def _variantes_imagen(origen, relativo, destino):
+    try:
+        from PIL import Image
+    except ImportError:
+        print("⚠ Pillow no está instalado: se omiten miniaturas y WebP.", file=sys.stderr)
+        return []
+    import io
+
+    variantes = []
+    base, _ = os.path.splitext(relativo)
+    with Image.open(origen) as img:
+        img = img.convert("RGB")
+        for ancho in ANCHOS_MINIATURA:
+            if ancho >= img.width:
+                continue
+            alto = round(img.height * ancho / img.width)
+            chica = img.resize((ancho, alto), Image.LANCZOS)
+            variante = {"ancho": ancho}
+            for formato, ext, opciones in (("webp", ".webp", {"quality": CALIDAD_WEBP, "method": 6}),
+                                           ("png", ".png", {"optimize": True})):
+                buf = io.BytesIO()
+                chica.save(buf, formato.upper(), **opciones)
+                variante[formato] = _escribir_con_hash(buf.getvalue(), f"{base}.w{ancho}{ext}", destino)
+            variantes.append(variante)
+    return variantes
+
+
+def construir(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir)
+    manifest = {}
+    for raiz, carpetas, archivos in os.walk(static_dir):
+        # No recompilar la salida de una compilación anterior
+        carpetas[:] = [c for c in carpetas
+                       if os.path.abspath(os.path.join(raiz, c)) != os.path.abspath(dist_dir)]
+        for nombre in sorted(archivos):
+            origen = os.path.join(raiz, nombre)
+            relativo = os.path.relpath(origen, static_dir).replace(os.sep, "/")
+            with open(origen, "rb") as f:
+                datos = f.read()
+            entrada = {"ruta": _escribir_con_hash(datos, relativo, dist_dir)}
+            ext = os.path.splitext(nombre)[1].lower()
+            if ext in EXT_COMPRIMIBLES:
+                entrada["codificaciones"] = _comprimir(os.path.join(dist_dir, entrada["ruta"]))
+            elif ext in EXT_IMAGENES:
+                entrada["variantes"] = _variantes_imagen(origen, relativo, dist_dir)
+            manifest[relativo] = entrada
+    with open(os.path.join(dist_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+# ---------------------------
+# Integración con Flask
+# ---------------------------
+def _cargar_manifest(dist_dir):
+    try:
+        with open(os.path.join(dist_dir, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class _SesionFueraDeAssets:
+    """Envuelve la interfaz de sesión: los archivos estáticos no la guardan.
+
+    Flask-Login mira la sesión en cada after_request y con eso Flask agrega
+    Vary: Cookie, que impide cachear en proxies y CDN una respuesta pública.
+    Un asset no cambia la sesión, así que no hay nada que guardar.
+    """
+
+    def __init__(self, interfaz, endpoints):
+        self._interfaz = interfaz
+        self._endpoints = endpoints
+
+    def __getattr__(self, nombre):
+        return getattr(self._interfaz, nombre)
+
+    def save_session(self, app, session, response):
+        if request.endpoint in self._endpoints and not session.modified:
+            return
+        self._interfaz.save_session(app, session, response)
+
+
+def _con_hash(manifest):
+    """Rutas generadas con hash en el nombre: las únicas que se sirven inmutables."""
+    rutas = set()
+    for entrada in manifest.values():
+        rutas.add(entrada["ruta"])
+        for variante in entrada.get("variantes", []):
+            rutas.update((variante["png"], variante["webp"]))
+    return rutas
+
+
+def init_assets(app, dist_dir=DIST_DIR):
+    manifest = _cargar_manifest(dist_dir)
+    servibles = _con_hash(manifest)
+    app.extensions["assets_manifest"] = manifest
+    app.session_interface = _SesionFueraDeAssets(app.session_interface, ("static", "asset"))
+
+    def asset_url(nombre, ancho=None):
+        """URL con hash de `nombre`; con `ancho`, la miniatura PNG más cercana por arriba."""
+        entrada = manifest.get(nombre)
+        if entrada is None:
+            return url_for("static", filename=nombre)
+        ruta = entrada["ruta"]
+        if ancho is not None:
+            for variante in entrada.get("variantes", []):
+                if variante["ancho"] >= ancho:
+                    ruta = variante["png"]
+                    break
+        return url_for("asset", nombre=ruta)
+
+    def img_srcset(nombre, formato="webp"):
+        """srcset con todas las miniaturas de `formato`; vacío si no hay."""
+        entrada = manifest.get(nombre) or {}
+        return ", ".join(f"{url_for('asset', nombre=v[formato])} {v['ancho']}w"
+                         for v in entrada.get("variantes", []))
+
+    app.jinja_env.globals.update(asset_url=asset_url, img_srcset=img_srcset)
+
+    @app.route("/assets/<path:nombre>", endpoint="asset")
+    def asset(nombre):
+        # El nombre lleva el hash del contenido: se puede cachear para siempre.
+        # Lo demás de dist/ (manifest.json, por ejemplo) no se sirve.
+        if nombre not in servibles:
+            abort(404)
+        codificacion = None
+        for cod, ext in (("br", ".br"), ("gzip", ".gz")):
+            # Respeta q=0 ("gzip;q=0" = no lo quiero)
+            if request.accept_encodings[cod] > 0 and os.path.isfile(os.path.join(dist_dir, nombre + ext)):
+                codificacion = (cod, ext)
+                break
+        if codificacion:
+            respuesta = send_from_directory(dist_dir, nombre + codificacion[1], max_age=UN_ANIO)
+            respuesta.headers["Content-Encoding"] = codificacion[0]
+            respuesta.headers.pop("Content-Disposition", None)
+            respuesta.mimetype = _mimetype(nombre)
+        else:
+            respuesta = send_from_directory(dist_dir, nombre, max_age=UN_ANIO)
+        respuesta.headers["Cache-Control"] = f"public, max-age={UN_ANIO}, immutable"
+        respuesta.vary.add("Accept-Encoding")
+        return respuesta
+
+    return manifest
+
+
+def _mimetype(nombre):
+    import mimetypes
+
+    return mimetypes.guess_type(nombre)[0] or "application/octet-stream"
+
+
+if __name__ == "__main__":
+    generado = construir()
+    print(f"✔ {len(generado)} assets en {os.path.relpath(DIST_DIR, BASE_DIR)}/")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Presupuesto de arranque en frío de la tienda web
+-------------------------------------------------
+Lanza varios procesos nuevos que hacen `import app` + `create_app()` (lo que
+paga cada worker y cada corrida de tests) y mide la mediana. Falla (código
+de salida 1) si:
+- la mediana supera el presupuesto (--presupuesto-ms), o
+- después de create_app() ya se importó algún módulo pesado que debería
+  cargarse recién cuando se usa (xhtml2pdf, alembic, Pillow...).
+
+Pensado para CI: correr en cada cambio que toque imports de app.py.
+
+Uso:
+    python benchmarks/bench_arranque.py
+    python benchmarks/bench_arranque.py --repeticiones 9 --presupuesto-ms 600
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from comun import RAIZ
+
+PRESUPUESTO_MS = 800
+PEREZOSOS = ("xhtml2pdf", "reportlab", "alembic", "flask_migrate", "PIL")
+
+WORKER = r"""
+import json, os, sys, time
+sys.path.insert(0, os.environ["RAIZ"])
+t0 = time.perf_counter()
+import app as modulo
+t1 = time.perf_counter()
+modulo.create_app()
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "create_app_ms": (t2 - t1) * 1000,
+                  "cargados": sorted(m for m in json.loads(os.environ["PEREZOSOS"]) if m in sys.modules)}))
+"""
+
+
+def medir(tmp):
+    entorno = dict(os.environ,
+                   RAIZ=RAIZ,
+                   PEREZOSOS=json.dumps(PEREZOSOS),
+                   DATABASE_URL="sqlite:///" + os.path.join(tmp, "tienda.db"),
+                   INVENTARIO_DB="",
+                   JINJA_BYTECODE_CACHE="")
+    salida = subprocess.check_output([sys.executable, "-c", WORKER], env=entorno, cwd=tmp)
+    return json.loads(salida.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--presupuesto-ms", type=float,
+                        default=float(os.environ.get("PRESUPUESTO_ARRANQUE_MS", PRESUPUESTO_MS)))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        medir(tmp)  # descarta la primera: calienta el cache de disco y los .pyc
+        corridas = [medir(tmp) for _ in range(args.repeticiones)]
+
+    importar = statistics.median(c["import_ms"] for c in corridas)
+    crear = statistics.median(c["create_app_ms"] for c in corridas)
+    total = statistics.median(c["import_ms"] + c["create_app_ms"] for c in corridas)
+    cargados = sorted({m for c in corridas for m in c["cargados"]})
+    print(f"import app     {importar:>8.1f} ms")
+    print(f"create_app()   {crear:>8.1f} ms")
+    print(f"total          {total:>8.1f} ms   (presupuesto {args.presupuesto_ms:.0f} ms)")
+
+    fallos = []
+    if total > args.presupuesto_ms:
+        fallos.append(f"el arranque ({total:.0f} ms) supera el presupuesto de {args.presupuesto_ms:.0f} ms")
+    if cargados:
+        fallos.append("módulos pesados importados al arrancar: " + ", ".join(cargados))
+    for fallo in fallos:
+        print(f"✘ {fallo}")
+    if fallos:
+        return 1
+    print("✔ Arranque dentro del presupuesto y sin imports pesados")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Agrupación de escrituras en InventarioAsync
+--------------------------------------------
+Mide escrituras concurrentes (asyncio.gather) frente a las mismas escrituras
+esperadas de a una, y comprueba el contrato de la fachada:
+- las escrituras que llegan juntas van en una sola transacción por lote;
+- una operación que falla solo falla su propio await, el resto se confirma;
+- si el COMMIT del lote falla, fallan todos sus awaits y nada queda escrito;
+- si se cancela el vaciado (en la ventana o con un lote en curso), todos los
+  awaits pendientes se resuelven en lugar de quedar colgados.
+
+Falla (código de salida 1) si algún caso no se cumple.
+
+Uso:
+    python benchmarks/bench_async.py
+    python benchmarks/bench_async.py --escrituras 5000 --max-lote 256
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from comun import poblar_inventario
+
+from inventario_async import InventarioAsync
+
+PRODUCTOS = 1000
+ESPERA_COLGADO = 5.0
+
+
+def cantidades(db_path: str, ids) -> dict:
+    conn = sqlite3.connect(db_path)
+    try:
+        return {prod_id: conn.execute("SELECT cantidad FROM productos WHERE id = ?",
+                                      (prod_id,)).fetchone()[0] for prod_id in ids}
+    finally:
+        conn.close()
+
+
+def contar_lotes(inv: InventarioAsync) -> list:
+    """Reemplaza `_aplicar_lote` por uno que anota el tamaño de cada lote."""
+    lotes = []
+    aplicar = inv._aplicar_lote
+
+    def contando(lote):
+        lotes.append(len(lote))
+        return aplicar(lote)
+
+    inv._aplicar_lote = contando
+    return lotes
+
+
+async def medir_agrupadas(db_path: str, escrituras: int, max_lote: int) -> list:
+    fallos = []
+    async with await InventarioAsync.abrir(db_path, max_lote=max_lote) as inv:
+        lotes = contar_lotes(inv)
+        ids = [1 + i % PRODUCTOS for i in range(escrituras)]
+        antes = cantidades(db_path, set(ids))
+
+        inicio = time.perf_counter()
+        for prod_id in ids:
+            await inv.ajustar_stock(prod_id, 1)
+        de_a_una = time.perf_counter() - inicio
+        lotes_de_a_una = len(lotes)
+
+        del lotes[:]
+        inicio = time.perf_counter()
+        await asyncio.gather(*(inv.ajustar_stock(prod_id, 1) for prod_id in ids))
+        agrupadas = time.perf_counter() - inicio
+
+    print(f"escrituras={escrituras} max_lote={max_lote}")
+    print(f"  de a una : {escrituras / de_a_una:10.1f} escrituras/s  lotes={lotes_de_a_una}")
+    print(f"  agrupadas: {escrituras / agrupadas:10.1f} escrituras/s  lotes={len(lotes)}  "
+          f"(x{de_a_una / agrupadas:.1f})")
+
+    esperados = math.ceil(escrituras / max_lote)
+    if len(lotes) != esperados or max(lotes) > max_lote:
+        fallos.append(f"agrupación: lotes={lotes}, esperados {esperados} de hasta {max_lote}")
+    despues = cantidades(db_path, antes)
+    veces = {prod_id: ids.count(prod_id) for prod_id in antes}
+    if any(despues[p] != antes[p] + 2 * veces[p] for p in antes):
+        fallos.append("agrupación: el stock final no suma todas las escrituras")
+    return fallos
+
+
+async def error_de_una_operacion(db_path: str) -> list:
+    async with await InventarioAsync.abrir(db_path) as inv:
+        lotes = contar_lotes(inv)
+        antes = cantidades(db_path, (1, 2, 3))
+        resultados = await asyncio.gather(
+            inv.ajustar_stock(1, 1),
+            inv.actualizar(2, cantidad=-1),  # ValueError
+            inv.ajustar_stock(3, 1),
+            return_exceptions=True,
+        )
+    despues = cantidades(db_path, (1, 2, 3))
+    if lotes != [3]:
+        return [f"error de una operación: lotes={lotes}, esperado [3]"]
+    if not isinstance(resultados[1], ValueError) or isinstance(resultados[0], BaseException) \
+            or isinstance(resultados[2], BaseException):
+        return [f"error de una operación: resultados={resultados}"]
+    if despues != {1: antes[1] + 1, 2: antes[2], 3: antes[3] + 1}:
+        return [f"error de una operación: antes={antes} después={despues}"]
+    return []
+
+
+async def commit_fallido(db_path: str) -> list:
+    async with await InventarioAsync.abrir(db_path) as inv:
+        await inv._ejecutar(inv._inv.conn.execute, "PRAGMA busy_timeout = 100")
+        antes = cantidades(db_path, (1, 2, 3))
+        # Un lector con la transacción abierta impide el COMMIT (journal sin WAL).
+        lector = sqlite3.connect(db_path, isolation_level=None)
+        lector.execute("BEGIN")
+        lector.execute("SELECT COUNT(*) FROM productos").fetchone()
+        try:
+            resultados = await asyncio.gather(
+                *(inv.ajustar_stock(prod_id, 1) for prod_id in (1, 2, 3)),
+                return_exceptions=True,
+            )
+        finally:
+            lector.rollback()
+            lector.close()
+    despues = cantidades(db_path, (1, 2, 3))
+    if not all(isinstance(r, sqlite3.OperationalError) for r in resultados):
+        return [f"commit fallido: resultados={resultados}"]
+    if despues != antes:
+        return [f"commit fallido: antes={antes} después={despues}"]
+    return []
+
+
+async def _cancelar_y_esperar(inv: InventarioAsync, futuros: list, nombre: str) -> list:
+    inv._vaciado.cancel()
+    try:
+        resultados = await asyncio.wait_for(
+            asyncio.gather(*futuros, return_exceptions=True), ESPERA_COLGADO)
+    except asyncio.TimeoutError:
+        colgados = sum(not f.done() for f in futuros)
+        return [f"{nombre}: {colgados} de {len(futuros)} awaits colgados"]
+    if not all(isinstance(r, asyncio.CancelledError) for r in resultados):
+        return [f"{nombre}: resultados={resultados}"]
+    return []
+
+
+async def cancelado_en_ventana(db_path: str) -> list:
+    async with await InventarioAsync.abrir(db_path, ventana=60) as inv:
+        futuros = [asyncio.ensure_future(inv.ajustar_stock(prod_id, 1)) for prod_id in range(1, 6)]
+        await asyncio.sleep(0.05)
+        return await _cancelar_y_esperar(inv, futuros, "cancelado en la ventana")
+
+
+async def cancelado_con_lote_en_curso(db_path: str) -> list:
+    async with await InventarioAsync.abrir(db_path, max_lote=2) as inv:
+        ocupado = asyncio.ensure_future(inv._ejecutar(time.sleep, 0.3))
+        futuros = [asyncio.ensure_future(inv.ajustar_stock(prod_id, 1)) for prod_id in range(1, 7)]
+        await asyncio.sleep(0.05)  # el primer lote espera detrás del hilo ocupado
+        fallos = await _cancelar_y_esperar(inv, futuros, "cancelado con un lote en curso")
+        await ocupado
+        return fallos
+
+
+CASOS = (
+    ("una operación con error solo falla su await", error_de_una_operacion),
+    ("un COMMIT fallido falla todo el lote", commit_fallido),
+    ("cancelar en la ventana resuelve los pendientes", cancelado_en_ventana),
+    ("cancelar con un lote en curso resuelve los pendientes", cancelado_con_lote_en_curso),
+)
+
+
+async def correr(args) -> int:
+    fallos = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "agrupadas.db")
+        poblar_inventario(db_path, PRODUCTOS)
+        errores = await medir_agrupadas(db_path, args.escrituras, args.max_lote)
+        for error in errores:
+            print(f"✘ {error}")
+        if not errores:
+            print("✔ escrituras concurrentes agrupadas en lotes")
+        fallos += len(errores)
+
+        for i, (nombre, caso) in enumerate(CASOS):
+            db_path = os.path.join(tmp, f"caso{i}.db")
+            poblar_inventario(db_path, PRODUCTOS)
+            errores = await caso(db_path)
+            for error in errores:
+                print(f"✘ {error}")
+            if not errores:
+                print(f"✔ {nombre}")
+            fallos += len(errores)
+    return 1 if fallos else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--escrituras", type=int, default=2000)
+    parser.add_argument("--max-lote", type=int, default=256)
+    return asyncio.run(correr(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Coherencia del cache del Inventario frente a commits de otros procesos
+-----------------------------------------------------------------------
+Inyecta un commit desde otra conexión en los momentos delicados y comprueba
+que el Inventario termina viendo el valor confirmado:
+- al cerrar, entre la sincronización y la escritura del snapshot;
+- al arrancar, entre abrir el snapshot y leer la posición del log de cambios;
+- en modo perezoso, con el producto caliente en el LRU, antes de listar_todos().
+
+Además comprueba que las escrituras propias avanzan la posición del log: tras
+ellas, un commit ajeno sobre un producto solo obliga a releer ese producto.
+
+Falla (código de salida 1) si algún caso devuelve un valor viejo o relee de
+más.
+
+Uso:
+    python benchmarks/bench_coherencia.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import contextmanager
+
+from comun import poblar_inventario
+
+import inventory_app
+from inventory_app import Inventario
+
+PRODUCTO = 1
+NUEVA_CANTIDAD = 555
+
+
+def confirmar_desde_otra_conexion(db_path: str) -> None:
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("UPDATE productos SET cantidad = ? WHERE id = ?", (NUEVA_CANTIDAD, PRODUCTO))
+    conn.close()
+
+
+@contextmanager
+def parche(objeto, nombre: str, valor):
+    original = objeto.__dict__[nombre]
+    setattr(objeto, nombre, valor)
+    try:
+        yield
+    finally:
+        setattr(objeto, nombre, original)
+
+
+def commit_al_escribir_snapshot(db_path: str, perezoso: bool) -> int:
+    inv = Inventario(db_path, usar_snapshot=True, perezoso=perezoso)
+    inv.productos[PRODUCTO]
+    escribir = inventory_app.escribir_snapshot
+
+    def con_commit(ruta, productos, ultimo_cambio):
+        confirmar_desde_otra_conexion(db_path)
+        escribir(ruta, productos, ultimo_cambio)
+
+    with parche(inventory_app, "escribir_snapshot", con_commit):
+        inv.cerrar()
+    inv = Inventario(db_path, usar_snapshot=True, perezoso=perezoso)
+    try:
+        return inv.productos[PRODUCTO].cantidad
+    finally:
+        inv.cerrar()
+
+
+def commit_al_abrir_snapshot(db_path: str, perezoso: bool) -> int:
+    Inventario(db_path, usar_snapshot=True, perezoso=perezoso).cerrar()  # deja el snapshot
+    abrir = inventory_app.Snapshot.abrir
+
+    def con_commit(ruta):
+        snapshot = abrir(ruta)
+        confirmar_desde_otra_conexion(db_path)
+        return snapshot
+
+    with parche(inventory_app.Snapshot, "abrir", staticmethod(con_commit)):
+        inv = Inventario(db_path, usar_snapshot=True, perezoso=perezoso)
+    try:
+        return inv.productos[PRODUCTO].cantidad
+    finally:
+        inv.cerrar()
+
+
+def commit_antes_de_listar(db_path: str, perezoso: bool) -> int:
+    inv = Inventario(db_path, perezoso=perezoso)
+    inv.productos[PRODUCTO]  # queda caliente en el LRU
+    confirmar_desde_otra_conexion(db_path)
+    try:
+        return next(p for p in inv.listar_todos() if p.id == PRODUCTO).cantidad
+    finally:
+        inv.cerrar()
+
+
+def releidos_tras_escrituras_propias(db_path: str, perezoso: bool) -> int:
+    inv = Inventario(db_path, perezoso=perezoso)
+    for prod_id in range(2, 52):
+        inv.ajustar_stock(prod_id, 1)
+    with inv.transaccion():
+        inv.ajustar_stock(52, 1)
+        inv.actualizar(53, precio=1.0)
+    confirmar_desde_otra_conexion(db_path)
+    releidos = set()
+    refrescar, recargar = inv._refrescar_ids, inv._cargar_cache
+
+    def contando(ids):
+        releidos.update(ids)
+        refrescar(ids)
+
+    def recarga_completa():
+        releidos.update(p.id for p in inv.listar_todos())
+        recargar()
+
+    inv._refrescar_ids, inv._cargar_cache = contando, recarga_completa
+    try:
+        if inv.productos[PRODUCTO].cantidad != NUEVA_CANTIDAD:
+            return -1
+        return len(releidos)
+    finally:
+        inv.cerrar()
+
+
+CASOS = (
+    # En modo perezoso el cierre lee con un SELECT que bloquea al escritor,
+    # así que el commit no puede caer en medio.
+    ("commit al escribir el snapshot (completo)", commit_al_escribir_snapshot, False, NUEVA_CANTIDAD),
+    ("commit al abrir el snapshot (completo)", commit_al_abrir_snapshot, False, NUEVA_CANTIDAD),
+    ("commit al abrir el snapshot (perezoso)", commit_al_abrir_snapshot, True, NUEVA_CANTIDAD),
+    ("commit antes de listar_todos (perezoso)", commit_antes_de_listar, True, NUEVA_CANTIDAD),
+    # Valor esperado: productos releídos tras el commit ajeno
+    ("escrituras propias no se releen (completo)", releidos_tras_escrituras_propias, False, 1),
+    ("escrituras propias no se releen (perezoso)", releidos_tras_escrituras_propias, True, 1),
+)
+
+
+def main() -> int:
+    fallos = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, (nombre, caso, perezoso, esperado) in enumerate(CASOS):
+            db_path = os.path.join(tmp, f"caso{i}.db")
+            poblar_inventario(db_path, 1000)
+            obtenido = caso(db_path, perezoso)
+            if obtenido == esperado:
+                print(f"✔ {nombre}")
+            else:
+                fallos += 1
+                print(f"✘ {nombre}: obtenido={obtenido}, esperado={esperado}")
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
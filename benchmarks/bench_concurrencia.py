@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark de concurrencia del Inventario (perfil WAL)
+------------------------------------------------------
+Varios hilos lectores llaman a buscar_por_nombre mientras un hilo escritor
+actualiza cantidades. Compara lecturas por el pool de lectores contra
+lecturas serializadas en la conexión de escritura (--lectores 0).
+
+Uso:
+    python benchmarks/bench_concurrencia.py --productos 100000 --hilos 8 --segundos 5
+    python benchmarks/bench_concurrencia.py --lectores 0
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from comun import percentil, poblar_inventario as poblar
+
+from inventory_app import Inventario
+
+
+def ejecutar(db_path: str, total: int, hilos: int, lectores: int, segundos: float) -> dict:
+    inv = Inventario(db_path, perezoso=True, concurrente=True, lectores=lectores)
+    fin = time.perf_counter() + segundos
+    latencias = [[] for _ in range(hilos)]
+    escrituras = [0]
+
+    def lector(i):
+        rnd = random.Random(i)
+        while time.perf_counter() < fin:
+            t0 = time.perf_counter()
+            inv.buscar_por_nombre(f"Producto {rnd.randrange(total):07d}"[:-2])
+            latencias[i].append(time.perf_counter() - t0)
+
+    def escritor():
+        rnd = random.Random(-1)
+        while time.perf_counter() < fin:
+            inv.actualizar(rnd.randrange(1, total + 1), cantidad=rnd.randrange(500))
+            escrituras[0] += 1
+
+    threads = [threading.Thread(target=lector, args=(i,)) for i in range(hilos)]
+    threads.append(threading.Thread(target=escritor))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    inv.cerrar()
+
+    todas = [x for lista in latencias for x in lista]
+    return {
+        "lectores": lectores,
+        "hilos_lectores": hilos,
+        "lecturas_s": len(todas) / segundos,
+        "escrituras_s": escrituras[0] / segundos,
+        "p50_ms": percentil(todas, 50) * 1000,
+        "p95_ms": percentil(todas, 95) * 1000,
+        "p99_ms": percentil(todas, 99) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--productos", type=int, default=100_000)
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--lectores", type=int, nargs="*", default=[0, 4])
+    parser.add_argument("--segundos", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        poblar(db_path, args.productos)
+        for lectores in args.lectores:
+            r = ejecutar(db_path, args.productos, args.hilos, lectores, args.segundos)
+            print(f"lectores={r['lectores']:<2} | lecturas/s={r['lecturas_s']:9.1f} | "
+                  f"escrituras/s={r['escrituras_s']:8.1f} | p50={r['p50_ms']:.2f}ms "
+                  f"p95={r['p95_ms']:.2f}ms p99={r['p99_ms']:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Micro-benchmarks del Inventario a escala
+-----------------------------------------
+Genera inventarios sintéticos (por defecto 10k, 100k y 1M productos) y mide:
+- arranque: modo completo, perezoso y con snapshot en caliente
+- CRUD individual: agregar, actualizar, ajustar_stock, eliminar
+- CRUD en lote: agregar dentro de transaccion() y ajustar_stock_lote
+- búsqueda por nombre y listado completo
+- memoria pico (tracemalloc) de cada modo de arranque
+
+Los tiempos se miden sin tracemalloc activo; la memoria se mide en una
+pasada aparte para no distorsionarlos.
+
+Uso:
+    python benchmarks/bench_inventario.py --salida base.json
+    python benchmarks/bench_inventario.py --tamanios 10000 100000 --comparar base.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from comun import commit_actual, poblar_inventario
+
+from inventory_app import Inventario, Producto
+
+OPERACIONES_INDIVIDUALES = 1000
+TAM_LOTE = 1000
+BUSQUEDAS = 20
+
+
+def cronometrar(funcion, repeticiones: int = 1) -> float:
+    """Segundos por repetición de `funcion`."""
+    gc.collect()
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+def memoria_pico(funcion) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        resultado = funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    if isinstance(resultado, Inventario):
+        resultado.cerrar()
+    return pico
+
+
+def medir_tamanio(tmp: str, total: int) -> dict:
+    db_path = os.path.join(tmp, f"inv_{total}.db")
+    poblar_inventario(db_path, total)
+    rnd = random.Random(total)
+    m = {}
+
+    # --- arranque ---
+    def abrir(**kw):
+        inv = Inventario(db_path, **kw)
+        inv.cerrar()
+
+    m["arranque_completo_s"] = cronometrar(lambda: abrir())
+    m["arranque_perezoso_s"] = cronometrar(lambda: abrir(perezoso=True))
+    abrir(usar_snapshot=True)  # deja el snapshot escrito
+    m["arranque_snapshot_s"] = cronometrar(lambda: abrir(usar_snapshot=True))
+    m["memoria_completo_bytes"] = memoria_pico(lambda: Inventario(db_path))
+    m["memoria_perezoso_bytes"] = memoria_pico(lambda: Inventario(db_path, perezoso=True))
+    m["memoria_snapshot_bytes"] = memoria_pico(lambda: Inventario(db_path, usar_snapshot=True))
+
+    # --- CRUD individual (modo perezoso, para aislar el costo de SQLite) ---
+    inv = Inventario(db_path, perezoso=True)
+    ids = [rnd.randrange(1, total + 1) for _ in range(OPERACIONES_INDIVIDUALES)]
+    nuevos = []
+    m["agregar_s"] = cronometrar(
+        lambda: nuevos.append(inv.agregar(Producto(None, "Bench", 10, 1.0))), OPERACIONES_INDIVIDUALES)
+    it = iter(ids)
+    m["actualizar_s"] = cronometrar(
+        lambda: inv.actualizar(next(it), cantidad=rnd.randrange(500)), OPERACIONES_INDIVIDUALES)
+    it = iter(ids)
+    m["ajustar_stock_s"] = cronometrar(lambda: inv.ajustar_stock(next(it), 1), OPERACIONES_INDIVIDUALES)
+    it = iter(nuevos)
+    m["eliminar_s"] = cronometrar(lambda: inv.eliminar(next(it)), OPERACIONES_INDIVIDUALES)
+
+    # --- CRUD en lote ---
+    def agregar_lote():
+        with inv.transaccion():
+            for _ in range(TAM_LOTE):
+                inv.agregar(Producto(None, "Lote", 10, 1.0))
+
+    m["agregar_lote_s"] = cronometrar(agregar_lote)
+    lote = {i: 1 for i in rnd.sample(range(1, total + 1), min(TAM_LOTE, total))}
+    m["ajustar_stock_lote_s"] = cronometrar(lambda: inv.ajustar_stock_lote(lote))
+
+    # --- lecturas ---
+    m["buscar_por_nombre_s"] = cronometrar(
+        lambda: inv.buscar_por_nombre(f"{rnd.randrange(total):07d}"[:5]), BUSQUEDAS)
+    m["listar_todos_perezoso_s"] = cronometrar(lambda: sum(1 for _ in inv.listar_todos()))
+    inv.cerrar()
+    completo = Inventario(db_path)
+    m["listar_todos_completo_s"] = cronometrar(lambda: sum(1 for _ in completo.listar_todos()))
+    completo.cerrar()
+
+    os.remove(db_path)
+    if os.path.exists(db_path + ".snap"):
+        os.remove(db_path + ".snap")
+    return m
+
+
+def imprimir(resultado: dict) -> None:
+    meta = resultado["meta"]
+    print(f"commit={meta['commit']} python={meta['python']}")
+    for total, metricas in resultado["tamanios"].items():
+        print(f"\n== {int(total):,} productos ==")
+        for nombre, valor in metricas.items():
+            if nombre.endswith("_bytes"):
+                print(f"  {nombre:<28}{valor / 2**20:>12.1f} MiB")
+            else:
+                print(f"  {nombre:<28}{valor * 1000:>12.3f} ms")
+
+
+def comparar(base: dict, actual: dict, tolerancia: float) -> list:
+    """Lista de (tamaño, métrica) que empeoraron más de `tolerancia`."""
+    regresiones = []
+    for total, metricas in actual["tamanios"].items():
+        anteriores = base["tamanios"].get(total, {})
+        for nombre, valor in metricas.items():
+            anterior = anteriores.get(nombre)
+            if not anterior:
+                continue
+            cambio = valor / anterior - 1
+            marca = "REGRESIÓN" if cambio > tolerancia else ""
+            print(f"{int(total):>9,} {nombre:<28}{cambio:>+8.0%} {marca}")
+            if marca:
+                regresiones.append((total, nombre))
+    return regresiones
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--tamanios", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--salida", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="empeoramiento relativo que cuenta como regresión")
+    args = parser.parse_args()
+
+    resultado = {
+        "meta": {"commit": commit_actual(), "python": platform.python_version()},
+        "tamanios": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for total in args.tamanios:
+            resultado["tamanios"][str(total)] = medir_tamanio(tmp, total)
+    imprimir(resultado)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        print()
+        if comparar(base, resultado, args.tolerancia):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Throughput del relay de la outbox según el tamaño de lote
+----------------------------------------------------------
+Llena outbox_eventos con N eventos sintéticos (SQLite temporal) y, para cada
+tamaño de lote, publica todo en un log vacío midiendo eventos/s. Después de
+cada corrida se comprueba que:
+- el log tiene cada evento exactamente una vez y en orden de id;
+- ningún evento quedó sin marcar como publicado;
+- reproducir desde offsets al azar devuelve exactamente el resto del log.
+
+Uso:
+    python benchmarks/bench_outbox.py --eventos 20000 --lotes 1,10,100,500,2000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from comun import RAIZ  # noqa: F401  (añade la raíz al sys.path)
+
+
+def preparar(tmp, eventos):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tmp, "tienda.db")
+    os.environ["OUTBOX_LOG"] = os.path.join(tmp, "eventos.jsonl")
+    os.environ["INVENTARIO_DB"] = ""  # nunca tocar el inventario de consola real
+    from app import create_app, db, EventoOutbox
+
+    app = create_app()
+    outbox = app.extensions["outbox"]
+
+    with app.app_context():
+        db.create_all()
+        ahora = datetime.utcnow()
+        datos = json.dumps({"id_compra": 0, "total": 10.5, "detalles": [
+            {"id_producto": 1, "nombre_producto": "Galleta Pink Star", "cantidad": 2, "precio": 2.5}]})
+        db.session.execute(db.insert(EventoOutbox), [
+            {"tipo": "compra_finalizada", "id_agregado": i, "datos": datos, "creado": ahora}
+            for i in range(eventos)])
+        db.session.commit()
+    return app, db, outbox, EventoOutbox
+
+
+def verificar(db, outbox, modelo, eventos, rnd):
+    leidos = list(outbox.feed.leer())
+    ids = [e["id"] for _, e, _ in leidos]
+    assert ids == sorted(ids) and len(ids) == len(set(ids)) == eventos, "log incompleto o duplicado"
+    pendientes = db.session.query(modelo).filter(modelo.publicado.is_(None)).count()
+    assert pendientes == 0, f"{pendientes} eventos sin marcar"
+    for _ in range(20):
+        i = rnd.randrange(len(leidos))
+        resto = [e["id"] for _, e, _ in outbox.feed.leer(leidos[i][0])]
+        assert resto == ids[i:], f"replay desde {leidos[i][0]} no coincide"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--eventos", type=int, default=20000)
+    parser.add_argument("--lotes", default="1,10,100,500,2000")
+    args = parser.parse_args()
+    lotes = [int(x) for x in args.lotes.split(",")]
+    rnd = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app, db, outbox, modelo = preparar(tmp, args.eventos)
+        print(f"{args.eventos} eventos; log en {outbox.feed.ruta}")
+        print(f"{'lote':>6}{'segundos':>11}{'eventos/s':>12}{'log (KB)':>10}")
+        with app.app_context():
+            for lote in lotes:
+                db.session.query(modelo).update({modelo.publicado: None})
+                db.session.commit()
+                if os.path.exists(outbox.feed.ruta):
+                    os.remove(outbox.feed.ruta)
+
+                t0 = time.perf_counter()
+                publicados = outbox.relay_todo(lote)
+                segundos = time.perf_counter() - t0
+                assert publicados == args.eventos, publicados
+                verificar(db, outbox, modelo, args.eventos, rnd)
+                print(f"{lote:>6}{segundos:>11.3f}{publicados / segundos:>12.0f}"
+                      f"{outbox.feed.fin() / 1024:>10.0f}")
+    print("✔ Log completo, sin duplicados y reproducible desde cualquier offset")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
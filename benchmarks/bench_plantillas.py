@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Latencia de /catalogo en workers fríos y calientes
+---------------------------------------------------
+Cada caso corre en un proceso nuevo (un "worker recién iniciado") y mide:
+- primera petición a /catalogo (compila plantillas o las lee del cache de
+  bytecode, y renderiza o no la grilla)
+- media y p95 de las siguientes peticiones (worker caliente)
+
+Casos: sin cache, solo bytecode en disco (ya poblado), solo cache de
+fragmentos, y ambos.
+
+Uso:
+    python benchmarks/bench_plantillas.py --peticiones 500
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from comun import RAIZ
+
+WORKER = r"""
+import json, os, sys, time
+sys.path.insert(0, os.environ["RAIZ"])
+from app import create_app, db
+app = create_app()
+with app.app_context():
+    db.create_all()
+c = app.test_client()
+c.post("/register", data={"nombre": "b", "email": "b@b.com", "password": "x"})
+c.post("/login", data={"email": "b@b.com", "password": "x"})
+t0 = time.perf_counter()
+c.get("/catalogo")
+primera = time.perf_counter() - t0
+tiempos = []
+for _ in range(int(os.environ["PETICIONES"])):
+    t0 = time.perf_counter()
+    c.get("/catalogo")
+    tiempos.append(time.perf_counter() - t0)
+tiempos.sort()
+print(json.dumps({"primera_ms": primera * 1000,
+                  "media_ms": sum(tiempos) / len(tiempos) * 1000,
+                  "p95_ms": tiempos[int(len(tiempos) * 0.95)] * 1000}))
+"""
+
+
+def correr_worker(tmp, bytecode, fragmentos, peticiones):
+    entorno = dict(os.environ,
+                   RAIZ=RAIZ,
+                   PETICIONES=str(peticiones),
+                   DATABASE_URL="sqlite:///" + os.path.join(tmp, f"w{os.getpid()}.db"),
+                   JINJA_BYTECODE_CACHE=bytecode,
+                   INVENTARIO_DB="",
+                   CACHE_FRAGMENTOS="1" if fragmentos else "0")
+    salida = subprocess.check_output([sys.executable, "-c", WORKER], env=entorno, cwd=tmp)
+    os.remove(os.path.join(tmp, f"w{os.getpid()}.db"))
+    return json.loads(salida.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--peticiones", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        carpeta_bytecode = os.path.join(tmp, "jinja_cache")
+        # Un worker previo deja el cache de bytecode poblado, como tras un deploy.
+        correr_worker(tmp, carpeta_bytecode, False, 1)
+        casos = [
+            ("sin cache", "", False),
+            ("bytecode", carpeta_bytecode, False),
+            ("fragmentos", "", True),
+            ("bytecode + fragmentos", carpeta_bytecode, True),
+        ]
+        print(f"{'caso':<24}{'1ª petición':>14}{'media':>10}{'p95':>10}")
+        for nombre, bytecode, fragmentos in casos:
+            r = correr_worker(tmp, bytecode, fragmentos, args.peticiones)
+            print(f"{nombre:<24}{r['primera_ms']:>11.2f} ms{r['media_ms']:>7.3f} ms{r['p95_ms']:>7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
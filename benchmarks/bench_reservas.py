@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Prueba de estrés de reservas de stock en el checkout web
+---------------------------------------------------------
+Varios procesos, cada uno con varios usuarios (test client de Flask contra
+la misma base), llenan carritos y compran productos con stock limitado hasta
+agotarlo. Una parte de los carritos se abandona para que sus reservas
+venzan; el barrido en segundo plano de cada proceso las libera.
+
+Al final, después de un barrido, se comprueba por producto que:
+- stock inicial == stock final + unidades vendidas (nada vendido de más ni
+  perdido);
+- no quedan reservas ni unidades reservadas;
+- el stock nunca quedó negativo.
+
+Con --inventario el stock sale de una base de inventory_app.py vinculada
+(INVENTARIO_DB) y además se comprueba que el inventario de consola terminó
+con las mismas unidades que la web.
+
+Por defecto usa SQLite (un solo escritor a la vez: mide corrección, no
+paralelismo). Con DATABASE_URL apuntando a MySQL se prueba la contención real
+por fila.
+
+Uso:
+    python benchmarks/bench_reservas.py --procesos 4 --usuarios 5 --stock 300
+    python benchmarks/bench_reservas.py --inventario
+    DATABASE_URL=mysql+pymysql://root:@localhost/tienda_bench python benchmarks/bench_reservas.py
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+from comun import RAIZ  # noqa: F401  (añade la raíz al sys.path)
+
+TTL = 2
+BARRIDO = 1
+
+
+def _crear_app():
+    from app import create_app
+
+    config = {"RESERVA_TTL_SEGUNDOS": TTL, "RESERVA_BARRIDO_SEGUNDOS": BARRIDO}
+    if os.environ["DATABASE_URL"].startswith("sqlite"):
+        # Los escritores esperan su turno en lugar de fallar con "database is locked"
+        config["SQLALCHEMY_ENGINE_OPTIONS"] = {"connect_args": {"timeout": 60}}
+    logging.getLogger("xhtml2pdf").setLevel(logging.ERROR)
+    return create_app(config)
+
+
+def comprador(proceso, usuarios, productos, abandono, semilla, limite):
+    rnd = random.Random(semilla)
+    app = _crear_app()
+    stats = {"compras": 0, "rechazadas": 0, "sin_stock": 0, "abandonados": 0, "errores": 0}
+    clientes = []
+    for u in range(usuarios):
+        c = app.test_client()
+        email = f"p{proceso}u{u}@example.com"
+        c.post("/register", data={"nombre": email, "email": email, "password": "x"})
+        c.post("/login", data={"email": email, "password": "x"})
+        clientes.append(c)
+
+    agotados = set()
+    fin = time.monotonic() + limite
+    while len(agotados) < len(productos) and time.monotonic() < fin:
+        c = rnd.choice(clientes)
+        metidos = 0
+        for _ in range(rnd.randint(1, 4)):
+            id_producto = rnd.choice(productos)
+            r = c.post(f"/agregar/{id_producto}")
+            if r.status_code >= 500:
+                stats["errores"] += 1
+            elif "No queda stock" in _flashes(c):
+                stats["sin_stock"] += 1
+                agotados.add(id_producto)
+            else:
+                metidos += 1
+        if not metidos:
+            continue
+        if rnd.random() < abandono:
+            # Carrito abandonado (se cierra la pestaña): la reserva queda hasta que vence
+            with c.session_transaction() as s:
+                s.pop("carrito", None)
+            stats["abandonados"] += 1
+            continue
+        r = c.post("/finalizar_compra")
+        if r.status_code >= 500:
+            stats["errores"] += 1
+        elif r.headers.get("Location", "").endswith("/mis_compras"):
+            stats["compras"] += 1
+        else:
+            stats["rechazadas"] += 1
+            with c.session_transaction() as s:
+                s.pop("carrito", None)
+    return stats
+
+
+def _flashes(cliente):
+    with cliente.session_transaction() as s:
+        mensajes = s.pop("_flashes", [])
+    return " ".join(m for _, m in mensajes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--procesos", type=int, default=4)
+    parser.add_argument("--usuarios", type=int, default=5, help="usuarios por proceso")
+    parser.add_argument("--productos", default="1,2,3")
+    parser.add_argument("--stock", type=int, default=200, help="unidades iniciales por producto")
+    parser.add_argument("--abandono", type=float, default=0.2, help="fracción de carritos abandonados")
+    parser.add_argument("--limite", type=float, default=120.0, help="segundos máximos por proceso")
+    parser.add_argument("--inventario", action="store_true",
+                        help="vincular un inventario de consola como fuente del stock")
+    args = parser.parse_args()
+    productos = [int(p) for p in args.productos.split(",")]
+
+    tmp = tempfile.mkdtemp(prefix="bench-reservas-")
+    os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tmp, "tienda.db"))
+    from app import CATALOGO, db, reservas, DetalleCompra, ReservaStock, StockProducto
+
+    inventario = None
+    if args.inventario:
+        from inventory_app import Inventario, Producto
+
+        ruta = os.path.join(tmp, "inventario.db")
+        inventario = Inventario(ruta)
+        ids_inventario = {p["id_producto"]: inventario.agregar(Producto(None, p["nombre"], args.stock, p["precio"]))
+                          for p in CATALOGO if p["id_producto"] in productos}
+        inventario.cerrar()
+        os.environ["INVENTARIO_DB"] = ruta
+    else:
+        os.environ["INVENTARIO_DB"] = ""  # nunca tocar el inventario de consola real
+
+    app = _crear_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        if args.inventario:
+            reservas.sincronizar_inventario()
+        else:
+            for id_producto in productos:
+                reservas.fijar(id_producto, args.stock)
+
+    t0 = time.perf_counter()
+    with multiprocessing.Pool(args.procesos) as pool:
+        resultados = pool.starmap(comprador, [
+            (i, args.usuarios, productos, args.abandono, 1000 + i, args.limite)
+            for i in range(args.procesos)])
+    segundos = time.perf_counter() - t0
+
+    totales = {k: sum(r[k] for r in resultados) for k in resultados[0]}
+    print(f"{args.procesos} procesos x {args.usuarios} usuarios, {args.stock} u. de {productos} "
+          f"en {segundos:.1f} s")
+    print("  " + "  ".join(f"{k}={v}" for k, v in totales.items()))
+    print(f"  {totales['compras'] / segundos:.1f} compras/s")
+
+    time.sleep(TTL + 0.5)
+    fallos = []
+    with app.app_context():
+        liberadas = reservas.barrer()
+        print(f"  barrido final: {liberadas} reservas vencidas liberadas")
+        for id_producto in productos:
+            stock = db.session.get(StockProducto, id_producto)
+            vendidas = db.session.query(db.func.coalesce(db.func.sum(DetalleCompra.cantidad), 0)) \
+                .filter(DetalleCompra.id_producto == id_producto).scalar()
+            print(f"  producto {id_producto}: vendidas={vendidas} stock={stock.cantidad} "
+                  f"reservada={stock.reservada}")
+            if stock.cantidad + vendidas != args.stock:
+                fallos.append(f"producto {id_producto}: {stock.cantidad} + {vendidas} != {args.stock}")
+            if stock.cantidad < 0 or stock.reservada != 0:
+                fallos.append(f"producto {id_producto}: cantidad={stock.cantidad} reservada={stock.reservada}")
+            if args.inventario:
+                inventario = Inventario(os.environ["INVENTARIO_DB"], perezoso=True)
+                en_consola = inventario.productos[ids_inventario[id_producto]].cantidad
+                inventario.cerrar()
+                if en_consola != stock.cantidad:
+                    fallos.append(f"producto {id_producto}: consola={en_consola} web={stock.cantidad}")
+        quedan = db.session.query(ReservaStock).count()
+        if quedan:
+            fallos.append(f"quedan {quedan} reservas")
+    if totales["errores"]:
+        fallos.append(f"{totales['errores']} respuestas 5xx")
+    for fallo in fallos:
+        print(f"✘ {fallo}")
+    if fallos:
+        return 1
+    print("✔ Sin sobreventa, sin unidades perdidas y sin reservas colgadas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Escalado de servidor.py de 1 a N workers
+-----------------------------------------
+Para cada número de workers levanta servidor.py sobre una base SQLite
+temporal, inicia sesión una vez y lanza varios procesos cliente que piden
+una ruta (por defecto /catalogo) en bucle durante unos segundos. Informa
+peticiones/s, latencia p50/p95 y la aceleración respecto de 1 worker.
+
+Los clientes corren en la misma máquina y también consumen CPU: con N
+núcleos la curva se aplana antes de llegar a N workers.
+
+Uso:
+    python benchmarks/bench_servidor.py --workers 1,2,4 --clientes 8 --segundos 5
+    python benchmarks/bench_servidor.py --ruta /mis_compras
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+from comun import RAIZ, percentil
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _pedir(puerto, metodo, ruta, cookie=None, cuerpo=None):
+    conn = http.client.HTTPConnection("127.0.0.1", puerto, timeout=30)
+    cabeceras = {"Cookie": cookie} if cookie else {}
+    if cuerpo is not None:
+        cabeceras["Content-Type"] = "application/x-www-form-urlencoded"
+        cuerpo = urllib.parse.urlencode(cuerpo)
+    conn.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+    r = conn.getresponse()
+    r.read()
+    conn.close()
+    return r
+
+
+def _esperar(puerto, proceso, limite=30.0):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if proceso.poll() is not None:
+            raise RuntimeError("servidor.py terminó al arrancar")
+        try:
+            _pedir(puerto, "GET", "/login")
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("servidor.py no respondió a tiempo")
+
+
+def _sesion(puerto):
+    datos = {"nombre": "Bench", "email": "bench@example.com", "password": "bench-1234"}
+    _pedir(puerto, "POST", "/register", cuerpo=datos)
+    r = _pedir(puerto, "POST", "/login", cuerpo={"email": datos["email"], "password": datos["password"]})
+    cookie = r.getheader("Set-Cookie")
+    if not cookie:
+        raise RuntimeError("no se pudo iniciar sesión")
+    return cookie.split(";", 1)[0]
+
+
+def _cliente(args):
+    puerto, ruta, cookie, segundos = args
+    latencias, errores = [], 0
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        t0 = time.perf_counter()
+        try:
+            estado = _pedir(puerto, "GET", ruta, cookie).status
+        except OSError:
+            estado = 599
+        latencias.append(time.perf_counter() - t0)
+        if estado >= 400:
+            errores += 1
+    return latencias, errores
+
+
+def medir(tmp, workers, clientes, segundos, ruta):
+    puerto = _puerto_libre()
+    base = os.path.join(tmp, f"tienda-{workers}.db")
+    entorno = dict(os.environ, DATABASE_URL="sqlite:///" + base, JINJA_BYTECODE_CACHE="", INVENTARIO_DB="")
+    subprocess.check_call([sys.executable, "-c",
+                           "from app import create_app, db\n"
+                           "app = create_app()\n"
+                           "with app.app_context(): db.create_all()"], env=entorno, cwd=RAIZ)
+    proceso = subprocess.Popen([sys.executable, os.path.join(RAIZ, "servidor.py"), "--puerto", str(puerto),
+                                "--workers", str(workers)], env=entorno, cwd=RAIZ,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _esperar(puerto, proceso)
+        cookie = _sesion(puerto)
+        with multiprocessing.Pool(clientes) as pool:
+            resultados = pool.map(_cliente, [(puerto, ruta, cookie, segundos)] * clientes)
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=60)
+    latencias = [l for lat, _ in resultados for l in lat]
+    errores = sum(e for _, e in resultados)
+    return len(latencias) / segundos, percentil(latencias, 50), percentil(latencias, 95), errores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    nucleos = os.cpu_count() or 1
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, 2, 4, nucleos}) if n <= nucleos),
+                        help="lista de números de workers a probar")
+    parser.add_argument("--clientes", type=int, default=max(4, nucleos * 2), help="procesos cliente")
+    parser.add_argument("--segundos", type=float, default=5.0)
+    parser.add_argument("--ruta", default="/catalogo")
+    args = parser.parse_args()
+
+    print(f"{nucleos} núcleos, {args.clientes} clientes, {args.segundos:.0f} s por caso, GET {args.ruta}")
+    print(f"{'workers':>8}{'pet/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'acel.':>8}{'errores':>9}")
+    base = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in (int(w) for w in args.workers.split(",")):
+            rps, p50, p95, errores = medir(tmp, workers, args.clientes, args.segundos, args.ruta)
+            base = base or rps
+            print(f"{workers:>8}{rps:>10.0f}{p50 * 1000:>10.2f}{p95 * 1000:>10.2f}"
+                  f"{rps / base:>7.2f}x{errores:>9}")
+
+
+if __name__ == "__main__":
+    main()
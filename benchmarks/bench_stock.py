@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Prueba de estrés de ajustes de stock concurrentes
+--------------------------------------------------
+Varios procesos (cada uno con su propia conexión) venden unidades de los
+mismos productos con Inventario.ajustar_stock hasta agotarlos. Al final se
+comprueba que no se vendió de más ni se perdió ninguna actualización: las
+ventas confirmadas deben coincidir exactamente con el stock inicial.
+
+Uso:
+    python benchmarks/bench_stock.py --procesos 8 --productos 5 --stock 2000
+    python benchmarks/bench_stock.py --lote 3
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventory_app import Inventario, Producto  # noqa: E402
+
+
+def vendedor(db_path: str, ids: list, lote: int, semilla: int) -> int:
+    rnd = random.Random(semilla)
+    inv = Inventario(db_path, perezoso=True)
+    vendidas = 0
+    agotados = set()
+    try:
+        while len(agotados) < len(ids):
+            disponibles = [i for i in ids if i not in agotados]
+            if lote > 1:
+                elegidos = rnd.sample(disponibles, min(lote, len(disponibles)))
+                if inv.ajustar_stock_lote({i: -1 for i in elegidos}) is not None:
+                    vendidas += len(elegidos)
+                    continue
+                # El lote falló por algún agotado: se averigua cuál uno a uno.
+                for i in elegidos:
+                    if inv.ajustar_stock(i, -1) is None:
+                        agotados.add(i)
+                    else:
+                        vendidas += 1
+            else:
+                i = rnd.choice(disponibles)
+                if inv.ajustar_stock(i, -1) is None:
+                    agotados.add(i)
+                else:
+                    vendidas += 1
+    finally:
+        inv.cerrar()
+    return vendidas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--procesos", type=int, default=8)
+    parser.add_argument("--productos", type=int, default=5)
+    parser.add_argument("--stock", type=int, default=2000)
+    parser.add_argument("--lote", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "stock.db")
+        inv = Inventario(db_path)
+        ids = [inv.agregar(Producto(None, f"Galleta {i}", args.stock, 1.0))
+               for i in range(args.productos)]
+        inv.cerrar()
+
+        inicio = time.perf_counter()
+        with multiprocessing.Pool(args.procesos) as pool:
+            ventas = pool.starmap(vendedor, [(db_path, ids, args.lote, s) for s in range(args.procesos)])
+        duracion = time.perf_counter() - inicio
+
+        inv = Inventario(db_path)
+        restante = sum(inv.productos[i].cantidad for i in ids)
+        inv.cerrar()
+
+    esperado = args.productos * args.stock
+    total = sum(ventas)
+    print(f"procesos={args.procesos} lote={args.lote} | vendidas={total}/{esperado} "
+          f"| restante={restante} | {total / duracion:.0f} ajustes/s")
+    if total != esperado or restante != 0:
+        sys.exit("✖ Inconsistencia: se vendió de más o se perdieron actualizaciones.")
+    print("✔ Sin sobreventa ni actualizaciones perdidas.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark de carga de la tienda web (app.py)
+---------------------------------------------
+Recorre los flujos reales de la tienda con N usuarios virtuales concurrentes:
+register, login, catalogo, agregar/actualizar carrito, ver carrito,
+finalizar_compra, mis_compras y factura.
+
+Por defecto usa el test client de Flask contra una base SQLite temporal
+(DATABASE_URL). Con --url se apunta a un servidor ya levantado.
+
+Informa throughput y latencias p50/p95/p99 por ruta, guarda los resultados
+en JSON y puede compararlos con una corrida anterior para marcar
+regresiones.
+
+Uso:
+    python benchmarks/bench_web.py --usuarios 8 --iteraciones 5 --salida base.json
+    python benchmarks/bench_web.py --usuarios 8 --comparar base.json --tolerancia 0.2
+    python benchmarks/bench_web.py --url http://127.0.0.1:5000
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from comun import commit_actual, percentil
+
+
+# ---------------------------
+# Clientes
+# ---------------------------
+class ClienteFlask:
+    """Adaptador mínimo sobre el test client (una instancia por hilo)."""
+
+    def __init__(self, app):
+        self._c = app.test_client()
+
+    def get(self, ruta):
+        r = self._c.get(ruta)
+        return r.status_code, r.get_data()
+
+    def post(self, ruta, datos=None):
+        r = self._c.post(ruta, data=datos or {})
+        return r.status_code, r.get_data()
+
+
+class ClienteHTTP:
+    """Cliente contra un servidor real, con cookies de sesión propias."""
+
+    def __init__(self, base):
+        import http.cookiejar
+        import urllib.request
+
+        self._base = base.rstrip("/")
+        self._urllib = urllib
+        self._opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            _SinRedirecciones(),
+        )
+
+    def _abrir(self, req):
+        try:
+            with self._opener.open(req) as r:
+                return r.status, r.read()
+        except self._urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def get(self, ruta):
+        return self._abrir(self._base + ruta)
+
+    def post(self, ruta, datos=None):
+        import urllib.parse
+        import urllib.request
+
+        cuerpo = urllib.parse.urlencode(datos or {}).encode()
+        return self._abrir(urllib.request.Request(self._base + ruta, data=cuerpo, method="POST"))
+
+
+def _SinRedirecciones():
+    import urllib.request
+
+    class SinRedirecciones(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    return SinRedirecciones()
+
+
+# ---------------------------
+# Escenario
+# ---------------------------
+def escenario(cliente, medir, iteraciones):
+    email = f"bench-{uuid.uuid4().hex}@example.com"
+    credenciales = {"email": email, "password": "bench-1234"}
+
+    medir("register", lambda: cliente.post("/register", {"nombre": "Bench", **credenciales}))
+    medir("login", lambda: cliente.post("/login", credenciales))
+    for _ in range(iteraciones):
+        medir("catalogo", lambda: cliente.get("/catalogo"))
+        medir("agregar_al_carrito", lambda: cliente.post("/agregar/1"))
+        medir("agregar_al_carrito", lambda: cliente.post("/agregar/3"))
+        medir("actualizar_carrito", lambda: cliente.post("/actualizar_carrito/1", {"accion": "sumar"}))
+        medir("ver_carrito", lambda: cliente.get("/carrito"))
+        medir("finalizar_compra", lambda: cliente.post("/finalizar_compra"))
+        _, html = medir("mis_compras", lambda: cliente.get("/mis_compras"))
+        facturas = re.findall(rb"/factura/(\d+)", html or b"")
+        if facturas:
+            medir("factura", lambda: cliente.get(f"/factura/{int(facturas[-1])}"))
+
+
+def preparar_app():
+    tmp = tempfile.mkdtemp(prefix="bench-web-")
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tmp, "tienda.db")
+    os.environ["INVENTARIO_DB"] = ""  # nunca tocar el inventario de consola real
+    from app import create_app, db
+
+    app = create_app()
+
+    # xhtml2pdf avisa por cada propiedad CSS que ignora al generar facturas.
+    logging.getLogger("xhtml2pdf").setLevel(logging.ERROR)
+    app.config["TESTING"] = False
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def correr(args):
+    app = None if args.url else preparar_app()
+    latencias = defaultdict(list)
+    errores = defaultdict(int)
+    lock = threading.Lock()
+
+    def hilo():
+        cliente = ClienteHTTP(args.url) if args.url else ClienteFlask(app)
+        locales = defaultdict(list)
+        fallos = defaultdict(int)
+
+        def medir(ruta, llamada):
+            t0 = time.perf_counter()
+            estado, cuerpo = llamada()
+            locales[ruta].append(time.perf_counter() - t0)
+            if estado >= 400:
+                fallos[ruta] += 1
+            return estado, cuerpo
+
+        escenario(cliente, medir, args.iteraciones)
+        with lock:
+            for ruta, valores in locales.items():
+                latencias[ruta].extend(valores)
+            for ruta, n in fallos.items():
+                errores[ruta] += n
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=hilo) for _ in range(args.usuarios)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    duracion = time.perf_counter() - inicio
+
+    rutas = {}
+    for ruta, valores in sorted(latencias.items()):
+        rutas[ruta] = {
+            "peticiones": len(valores),
+            "errores": errores[ruta],
+            "rps": len(valores) / duracion,
+            "p50_ms": percentil(valores, 50) * 1000,
+            "p95_ms": percentil(valores, 95) * 1000,
+            "p99_ms": percentil(valores, 99) * 1000,
+        }
+    return {
+        "meta": {
+            "commit": commit_actual(),
+            "python": platform.python_version(),
+            "usuarios": args.usuarios,
+            "iteraciones": args.iteraciones,
+            "modo": args.url or "test_client",
+            "duracion_s": duracion,
+        },
+        "total_rps": sum(len(v) for v in latencias.values()) / duracion,
+        "rutas": rutas,
+    }
+
+
+# ---------------------------
+# Reporte y comparación
+# ---------------------------
+def imprimir(resultado):
+    meta = resultado["meta"]
+    print(f"commit={meta['commit']} usuarios={meta['usuarios']} iteraciones={meta['iteraciones']} "
+          f"modo={meta['modo']} | total {resultado['total_rps']:.1f} req/s")
+    print(f"{'ruta':<20}{'n':>7}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for ruta, r in resultado["rutas"].items():
+        print(f"{ruta:<20}{r['peticiones']:>7}{r['errores']:>5}{r['rps']:>9.1f}"
+              f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}")
+
+
+def comparar(base, actual, tolerancia):
+    """Devuelve la lista de regresiones de p95 por encima de `tolerancia`."""
+    regresiones = []
+    for ruta, r in actual["rutas"].items():
+        anterior = base["rutas"].get(ruta)
+        if not anterior or anterior["p95_ms"] <= 0:
+            continue
+        cambio = r["p95_ms"] / anterior["p95_ms"] - 1
+        marca = "REGRESIÓN" if cambio > tolerancia else ""
+        print(f"{ruta:<20} p95 {anterior['p95_ms']:8.2f} -> {r['p95_ms']:8.2f} ms ({cambio:+.0%}) {marca}")
+        if marca:
+            regresiones.append(ruta)
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--usuarios", type=int, default=4, help="usuarios virtuales concurrentes")
+    parser.add_argument("--iteraciones", type=int, default=5, help="compras por usuario")
+    parser.add_argument("--url", help="servidor ya levantado en lugar del test client")
+    parser.add_argument("--salida", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="aumento relativo de p95 que cuenta como regresión")
+    args = parser.parse_args()
+
+    resultado = correr(args)
+    imprimir(resultado)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        if comparar(base, resultado, args.tolerancia):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
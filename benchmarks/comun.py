@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+"""Utilidades compartidas por los scripts de benchmarks/."""
+
+import os
+import sqlite3
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+def commit_actual():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def poblar_inventario(db_path: str, total: int) -> None:
+    """Crea un inventario sintético de `total` productos sin pasar por el cache."""
+    from inventory_app import Inventario
+
+    Inventario(db_path).cerrar()
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO productos (nombre, cantidad, precio) VALUES (?, ?, ?)",
+        ((f"Producto {i:07d}", i % 500, round(i * 0.01, 2)) for i in range(total)),
+    )
+    # La carga inicial no es un cambio que otros procesos deban reproducir.
+    conn.execute("DELETE FROM productos_cambios")
+    conn.commit()
+    conn.close()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+Cache de fragmentos HTML y de bytecode de Jinja
+------------------------------------------------
+- CacheFragmentos: guarda HTML ya renderizado bajo una clave (p. ej. versión
+  del catálogo + idioma). Acotado por número de entradas (LRU).
+- init_bytecode_cache: guarda en disco las plantillas compiladas para que un
+  worker recién iniciado no vuelva a compilar cada plantilla.
+
+Configuración (app.config o variables de entorno):
+    CACHE_FRAGMENTOS         "0" desactiva el cache de fragmentos
+    JINJA_BYTECODE_CACHE     carpeta del cache de bytecode
+                             (por defecto <instance>/jinja_cache; "" lo desactiva)
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+MAX_FRAGMENTOS = 128
+
+
+def version_de(datos):
+    """Huella estable de datos serializables en JSON (p. ej. el catálogo)."""
+    crudo = json.dumps(datos, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha1(crudo).hexdigest()[:12]
+
+
+class CacheFragmentos:
+    def __init__(self, max_entradas=MAX_FRAGMENTOS, activo=True):
+        self.max_entradas = max_entradas
+        self.activo = activo
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave, renderizar):
+        """Devuelve el fragmento de `clave`, renderizándolo si no está."""
+        if not self.activo:
+            return Markup(renderizar())
+        with self._lock:
+            html = self._datos.get(clave)
+            if html is not None:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return html
+        # Se renderiza fuera del lock: dos hilos pueden hacerlo a la vez la
+        # primera vez, pero el resultado es idéntico.
+        html = Markup(renderizar())
+        with self._lock:
+            self.fallos += 1
+            self._datos[clave] = html
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+        return html
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+
+def _config(app, clave, defecto):
+    return app.config.get(clave, os.environ.get(clave, defecto))
+
+
+def crear_cache_fragmentos(app):
+    activo = str(_config(app, "CACHE_FRAGMENTOS", "1")).lower() not in ("0", "false", "no")
+    return CacheFragmentos(activo=activo)
+
+
+def init_bytecode_cache(app):
+    """Debe llamarse antes de que se use app.jinja_env por primera vez."""
+    carpeta = _config(app, "JINJA_BYTECODE_CACHE", os.path.join(app.instance_path, "jinja_cache"))
+    if not carpeta:
+        return None
+    os.makedirs(carpeta, exist_ok=True)
+    cache = FileSystemBytecodeCache(carpeta)
+    app.jinja_options = {**app.jinja_options, "bytecode_cache": cache}
+    return cache
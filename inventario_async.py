@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Fachada asíncrona del Inventario
+---------------------------------
+Permite usar `Inventario` desde asyncio sin bloquear el event loop:
+- Todo el trabajo con SQLite corre en un único hilo dedicado (la conexión
+  nunca cambia de hilo).
+- Las escrituras pequeñas que llegan a la vez se agrupan en una sola
+  transacción; cada una conserva su propio resultado o excepción.
+
+Uso:
+    async with await InventarioAsync.abrir("inventario.db") as inv:
+        nuevo_id = await inv.agregar(Producto(None, "Galleta", 10, 2.5))
+        await inv.ajustar_stock(nuevo_id, -1)
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from inventory_app import DB_NAME, Inventario, Producto
+
+MAX_LOTE_ESCRITURAS = 256
+
+
+class InventarioAsync:
+    def __init__(self, inventario: Inventario, ejecutor: ThreadPoolExecutor, *,
+                 max_lote: int = MAX_LOTE_ESCRITURAS, ventana: float = 0.0) -> None:
+        self._inv = inventario
+        self._ejecutor = ejecutor
+        self.max_lote = max_lote
+        self.ventana = ventana
+        self._pendientes: List[Tuple[Callable, tuple, dict, asyncio.Future]] = []
+        self._vaciado: Optional[asyncio.Task] = None
+
+    @classmethod
+    async def abrir(cls, db_path: str = DB_NAME, *, max_lote: int = MAX_LOTE_ESCRITURAS,
+                    ventana: float = 0.0, **opciones: Any) -> "InventarioAsync":
+        """Crea el Inventario dentro del hilo dedicado.
+
+        `ventana` es cuánto espera (en segundos) el primer escritor a que
+        lleguen otros antes de abrir la transacción; con 0 solo se agrupan
+        las escrituras encoladas en la misma vuelta del loop.
+        """
+        ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inventario")
+        loop = asyncio.get_running_loop()
+        inventario = await loop.run_in_executor(ejecutor, partial(Inventario, db_path, **opciones))
+        return cls(inventario, ejecutor, max_lote=max_lote, ventana=ventana)
+
+    async def __aenter__(self) -> "InventarioAsync":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.cerrar()
+
+    # ---------------------------
+    # Ejecución en el hilo dedicado
+    # ---------------------------
+    async def _ejecutar(self, funcion: Callable, *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._ejecutor, partial(funcion, *args, **kwargs))
+
+    def _escribir(self, metodo: Callable, *args: Any, **kwargs: Any) -> asyncio.Future:
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendientes.append((metodo, args, kwargs, futuro))
+        if self._vaciado is None or self._vaciado.done():
+            self._vaciado = asyncio.ensure_future(self._vaciar())
+        return futuro
+
+    async def _vaciar(self) -> None:
+        try:
+            if self.ventana > 0:
+                await asyncio.sleep(self.ventana)
+            else:
+                await asyncio.sleep(0)
+            while self._pendientes:
+                lote = self._pendientes[:self.max_lote]
+                del self._pendientes[:self.max_lote]
+                try:
+                    resultados = await self._ejecutar(self._aplicar_lote, lote)
+                except BaseException as exc:
+                    # La transacción entera falló al confirmar: nadie quedó escrito.
+                    self._fallar(lote, exc)
+                    if not isinstance(exc, Exception):
+                        raise
+                    continue
+                for (_, _, _, futuro), (ok, valor) in zip(lote, resultados):
+                    if futuro.done():  # el llamador canceló su await
+                        continue
+                    if ok:
+                        futuro.set_result(valor)
+                    else:
+                        futuro.set_exception(valor)
+        except asyncio.CancelledError as exc:
+            # Con el vaciado cancelado nadie más resolvería la cola: quien
+            # espera una escritura todavía encolada recibe la cancelación.
+            pendientes, self._pendientes = self._pendientes, []
+            self._fallar(pendientes, exc)
+            raise
+
+    @staticmethod
+    def _fallar(lote: list, exc: BaseException) -> None:
+        for _, _, _, futuro in lote:
+            if not futuro.done():
+                futuro.set_exception(exc)
+
+    def _aplicar_lote(self, lote: list) -> List[Tuple[bool, Any]]:
+        # Corre en el hilo dedicado. Cada operación va en su propio SAVEPOINT
+        # (ver Inventario._atomico), así que un error no arrastra a las demás.
+        resultados = []
+        with self._inv.transaccion():
+            for metodo, args, kwargs, _ in lote:
+                try:
+                    resultados.append((True, metodo(*args, **kwargs)))
+                except Exception as exc:
+                    resultados.append((False, exc))
+        return resultados
+
+    # ---------------------------
+    # Escrituras (agrupadas)
+    # ---------------------------
+    async def agregar(self, producto: Producto) -> int:
+        return await self._escribir(self._inv.agregar, producto)
+
+    async def actualizar(self, prod_id: int, *, nombre: Optional[str] = None,
+                         cantidad: Optional[int] = None, precio: Optional[float] = None) -> bool:
+        return await self._escribir(self._inv.actualizar, prod_id,
+                                    nombre=nombre, cantidad=cantidad, precio=precio)
+
+    async def eliminar(self, prod_id: int) -> bool:
+        return await self._escribir(self._inv.eliminar, prod_id)
+
+    async def ajustar_stock(self, prod_id: int, delta: int) -> Optional[int]:
+        return await self._escribir(self._inv.ajustar_stock, prod_id, delta)
+
+    async def ajustar_stock_lote(self, ajustes: Dict[int, int]) -> Optional[Dict[int, int]]:
+        return await self._escribir(self._inv.ajustar_stock_lote, dict(ajustes))
+
+    # ---------------------------
+    # Lecturas
+    # ---------------------------
+    async def obtener(self, prod_id: int) -> Optional[Producto]:
+        return await self._ejecutar(lambda: self._inv.productos.get(prod_id))
+
+    async def buscar_por_nombre(self, texto: str) -> List[Producto]:
+        return await self._ejecutar(self._inv.buscar_por_nombre, texto)
+
+    async def listar_todos(self) -> List[Producto]:
+        return await self._ejecutar(lambda: list(self._inv.listar_todos()))
+
+    async def cerrar(self) -> None:
+        if self._vaciado is not None and not self._vaciado.cancelled():
+            await self._vaciado
+        await self._ejecutar(self._inv.cerrar)
+        self._ejecutor.shutdown(wait=True)
@@ -7,18 +7,47 @@ Sistema Avanzado de Gestión de Inventario (Consola + SQLite)
 Características:
 - POO: clases Producto e Inventario
 - Colecciones: diccionario para cache local (id -> Producto)
+- Modo perezoso: LRU acotado de productos cargados bajo demanda o por página
+- Snapshot binario (mmap) del cache para arranques en caliente
+- Coherencia entre procesos: PRAGMA data_version + log de cambios por triggers
+- Perfil concurrente opcional: WAL, pool de lectores y un escritor serializado
 - CRUD completo sincronizado con SQLite
 - Menú interactivo por consola
 
 Uso:
     python inventory_app.py
+    python inventory_app.py --perezoso
 """
 
+import functools
+import mmap
+import os
+import queue
 import sqlite3
+import struct
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional
 
 DB_NAME = "inventario.db"
+TAM_CACHE_LRU = 1024
+TAM_PAGINA = 500
+LIMITE_LOG_CAMBIOS = 10000
+NUM_LECTORES = 4
+
+# PRAGMAs del perfil concurrente. journal_mode=WAL persiste en el archivo;
+# el resto se aplica a cada conexión.
+PRAGMAS_CONCURRENTE = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+)
 
 # =========================
 #   MODELO DE DOMINIO
@@ -67,351 +96,537 @@ class Producto:
     def to_row(self) -> tuple:
         return (self.nombre, self.cantidad, self.precio)
 
+def _producto_desde_fila(row: sqlite3.Row) -> Producto:
+    return Producto(id=row["id"], nombre=row["nombre"],
+                    cantidad=row["cantidad"], precio=row["precio"])
+
 # =========================
-#        INVENTARIO
+#      CACHE LRU
 # =========================
-class Inventario:
-    def __init__(self, db_path: str = DB_NAME) -> None:
-        self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
-        self._crear_tabla()
-        self.productos: Dict[int, Producto] = {}
-        self._cargar_cache()
-
-    def _crear_tabla(self) -> None:
-        self.conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS productos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT NOT NULL,
-                cantidad INTEGER NOT NULL CHECK (cantidad >= 0),
-                precio REAL NOT NULL CHECK (precio >= 0)
-            )
-            """
-        )
-        self.conn.commit()
-
-    def _cargar_cache(self) -> None:
-        self.productos.clear()
-        for row in self.conn.execute("SELECT id, nombre, cantidad, precio FROM productos"):
-            prod = Producto(id=row["id"], nombre=row["nombre"],
-                            cantidad=row["cantidad"], precio=row["precio"])
-            self.productos[prod.id] = prod
-
-    def agregar(self, producto: Producto) -> int:
-        cur = self.conn.execute(
-            "INSERT INTO productos (nombre, cantidad, precio) VALUES (?, ?, ?)",
-            producto.to_row(),
-        )
-        self.conn.commit()
-        new_id = cur.lastrowid
-        producto.set_id(new_id)
-        self.productos[new_id] = producto
-        return new_id
-
-    def eliminar(self, prod_id: int) -> bool:
-        cur = self.conn.execute("DELETE FROM productos WHERE id = ?", (prod_id,))
-        self.conn.commit()
-        eliminado = cur.rowcount > 0
-        if eliminado:
-            self.productos.pop(prod_id, None)
-        return eliminado
-
-    def actualizar(self, prod_id: int, *, nombre: Optional[str] = None,
-                   cantidad: Optional[int] = None, precio: Optional[float] = None) -> bool:
-        if prod_id not in self.productos:
+class CacheLRU(MutableMapping):
+    """Cache acotado id -> Producto que carga desde SQLite en cada fallo.
+
+    `in`, `[]` y `get` consultan la base si el id no está en memoria, así que
+    el código que trataba `Inventario.productos` como un dict completo sigue
+    funcionando con una cache parcial. Iterar o usar `len` solo cubre los
+    productos calientes.
+    """
+
+    def __init__(self, cargador: Callable[[int], Optional[Producto]],
+                 capacidad: int = TAM_CACHE_LRU) -> None:
+        if capacidad < 1:
+            raise ValueError("La capacidad del cache debe ser positiva.")
+        self._cargador = cargador
+        self.capacidad = capacidad
+        self._datos: "OrderedDict[int, Producto]" = OrderedDict()
+
+    def __getitem__(self, prod_id: int) -> Producto:
+        if prod_id in self._datos:
+            self._datos.move_to_end(prod_id)
+            return self._datos[prod_id]
+        prod = self._cargador(prod_id)
+        if prod is None:
+            raise KeyError(prod_id)
+        self[prod_id] = prod
+        return prod
+
+    def __setitem__(self, prod_id: int, producto: Producto) -> None:
+        self._datos[prod_id] = producto
+        self._datos.move_to_end(prod_id)
+        while len(self._datos) > self.capacidad:
+            self._datos.popitem(last=False)
+
+    def __delitem__(self, prod_id: int) -> None:
+        del self._datos[prod_id]
+
+    def __contains__(self, prod_id: object) -> bool:
+        try:
+            self[prod_id]  # type: ignore[index]
+        except KeyError:
             return False
+        return True
 
-        campos = []
-        valores = []
-        if nombre is not None:
-            campos.append("nombre = ?")
-            valores.append(nombre)
-        if cantidad is not None:
-            if cantidad < 0:
-                raise ValueError("La cantidad no puede ser negativa.")
-            campos.append("cantidad = ?")
-            valores.append(cantidad)
-        if precio is not None:
-            if precio < 0:
-                raise ValueError("El precio no puede ser negativo.")
-            campos.append("precio = ?")
-            valores.append(precio)
+    def __iter__(self) -> Iterator[int]:
+        return iter(list(self._datos))
 
-        if not campos:
-            return False
+    def __len__(self) -> int:
+        return len(self._datos)
 
-        valores.append(prod_id)
-        sql = f"UPDATE productos SET {', '.join(campos)} WHERE id = ?"
-        cur = self.conn.execute(sql, tuple(valores))
-        self.conn.commit()
+    def en_memoria(self, prod_id: int) -> bool:
+        return prod_id in self._datos
 
-        if cur.rowcount > 0:
-            p = self.productos[prod_id]
-            if nombre is not None:
-                p.set_nombre(nombre)
-            if cantidad is not None:
-                p.set_cantidad(cantidad)
-            if precio is not None:
-                p.set_precio(precio)
-            return True
-        return False
+    def descartar(self, prod_id: int) -> None:
+        """Saca un id de memoria sin consultar la base (a diferencia de pop)."""
+        self._datos.pop(prod_id, None)
 
-    def buscar_por_nombre(self, texto: str) -> List[Producto]:
-        patron = f"%{texto.strip()}%"
-        filas = self.conn.execute(
-            "SELECT id, nombre, cantidad, precio FROM productos WHERE nombre LIKE ? COLLATE NOCASE",
-            (patron,),
-        ).fetchall()
-        return [Producto(row["id"], row["nombre"], row["cantidad"], row["precio"]) for row in filas]
-
-    def listar_todos(self) -> List[Producto]:
-        return list(self.productos.values())
-
-    def cerrar(self) -> None:
-        self.conn.close()
+    def clear(self) -> None:
+        self._datos.clear()
 
 # =========================
-#        UI CONSOLA
+#     SNAPSHOT BINARIO
 # =========================
-def pedir_int(msg: str, *, minimo: Optional[int] = None) -> int:
-    while True:
+# Formato (little endian):
+#   cabecera: magia, versión, último seq de productos_cambios que refleja,
+#             número de registros, crc32 del cuerpo
+#   registros de ancho fijo ordenados por id: id, cantidad, precio,
+#             desplazamiento y largo del nombre
+#   blob con los nombres en UTF-8
+#
+# Al abrirlo se aplican los cambios del log posteriores a ese seq, así que un
+# commit de otro proceso mientras se escribía (o se abría) nunca queda oculto.
+SNAPSHOT_MAGIA = b"INVSNAP\0"
+SNAPSHOT_VERSION = 2
+_CABECERA = struct.Struct("<8sHqqI")
+_REGISTRO = struct.Struct("<qqdII")
+
+
+class Snapshot:
+    """Vista de solo lectura sobre un snapshot mapeado en memoria."""
+
+    def __init__(self, ruta: str, archivo, mapa: mmap.mmap, total: int, ultimo_cambio: int) -> None:
+        self.ruta = ruta
+        self.ultimo_cambio = ultimo_cambio
+        self._archivo = archivo
+        self._mapa = mapa
+        self._total = total
+        self._inicio_nombres = _CABECERA.size + total * _REGISTRO.size
+
+    @classmethod
+    def abrir(cls, ruta: str) -> Optional["Snapshot"]:
+        """Abre el snapshot si está completo; None si falta o está dañado."""
+        if not os.path.exists(ruta):
+            return None
+        archivo = open(ruta, "rb")
         try:
-            valor = int(input(msg))
-            if minimo is not None and valor < minimo:
-                print(f"Debe ser ≥ {minimo}.")
-                continue
-            return valor
-        except ValueError:
-            print("Ingrese un número entero válido.")
-
-def pedir_float(msg: str, *, minimo: Optional[float] = None) -> float:
-    while True:
+            mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # archivo vacío
+            archivo.close()
+            return None
         try:
-            valor = float(input(msg))
-            if minimo is not None and valor < minimo:
-                print(f"Debe ser ≥ {minimo}.")
-                continue
-            return valor
-        except ValueError:
-            print("Ingrese un número válido (use punto decimal).")
-
-def menu() -> None:
-    inv = Inventario()
-    print("✅ Inventario listo. Base de datos:", inv.db_path)
-
-    opciones = {
-        "1": "Añadir producto",
-        "2": "Eliminar producto por ID",
-        "3": "Actualizar producto",
-        "4": "Buscar por nombre",
-        "5": "Mostrar todos",
-        "0": "Salir",
-    }
-
-    try:
-        while True:
-            print("\n--- MENÚ INVENTARIO ---")
-            for k, v in opciones.items():
-                print(f"[{k}] {v}")
-            op = input("Elija opción: ").strip()
-
-            if op == "1":
-                nombre = input("Nombre: ").strip()
-                cantidad = pedir_int("Cantidad: ", minimo=0)
-                precio = pedir_float("Precio: ", minimo=0)
-                prod = Producto(id=None, nombre=nombre, cantidad=cantidad, precio=precio)
-                new_id = inv.agregar(prod)
-                print(f"✔ Producto añadido con ID {new_id}.")
-
-            elif op == "2":
-                pid = pedir_int("ID a eliminar: ", minimo=1)
-                if inv.eliminar(pid):
-                    print("✔ Eliminado.")
-                else:
-                    print("✖ No existe ese ID.")
-
-            elif op == "3":
-                pid = pedir_int("ID a actualizar: ", minimo=1)
-                if pid not in inv.productos:
-                    print("✖ No existe ese ID.")
-                    continue
-                print("Deje vacío para no cambiar.")
-                nombre = input("Nuevo nombre: ").strip()
-                cantidad_txt = input("Nueva cantidad: ").strip()
-                precio_txt = input("Nuevo precio: ").strip()
-
-                kwargs = {}
-                if nombre:
-                    kwargs["nombre"] = nombre
-                if cantidad_txt:
-                    try:
-                        kwargs["cantidad"] = int(cantidad_txt)
-                    except ValueError:
-                        print("Cantidad inválida. Se ignora.")
-                if precio_txt:
-                    try:
-                        kwargs["precio"] = float(precio_txt)
-                    except ValueError:
-                        print("Precio inválido. Se ignora.")
-
-                if inv.actualizar(pid, **kwargs):
-                    print("✔ Actualizado.")
-                else:
-                    print("✖ No se realizó ningún cambio.")
-
-            elif op == "4":
-                q = input("Texto a buscar: ").strip()
-                resultados = inv.buscar_por_nombre(q)
-                if not resultados:
-                    print("No se encontraron productos.")
-                else:
-                    print(f"{len(resultados)} resultado(s):")
-                    for p in resultados:
-                        print(f"- ID={p.id} | {p.nombre} | Cant={p.cantidad} | Precio={p.precio:.2f}")
-
-            elif op == "5":
-                items = inv.listar_todos()
-                if not items:
-                    print("Inventario vacío.")
-                else:
-                    print("Productos en inventario:")
-                    for p in items:
-                        print(f"- ID={p.id} | {p.nombre} | Cant={p.cantidad} | Precio={p.precio:.2f}")
-
-            elif op == "0":
-                print("Hasta pronto 👋")
-                break
+            magia, version, ultimo_cambio, total, crc = _CABECERA.unpack_from(mapa, 0)
+            valido = (
+                magia == SNAPSHOT_MAGIA
+                and version == SNAPSHOT_VERSION
+                and zlib.crc32(memoryview(mapa)[_CABECERA.size:]) == crc
+            )
+        except struct.error:
+            valido = False
+        if not valido:
+            mapa.close()
+            archivo.close()
+            return None
+        return cls(ruta, archivo, mapa, total, ultimo_cambio)
+
+    def __len__(self) -> int:
+        return self._total
+
+    def _producto(self, registro: tuple) -> Producto:
+        prod_id, cantidad, precio, desde, largo = registro
+        inicio = self._inicio_nombres + desde
+        nombre = self._mapa[inicio:inicio + largo].decode("utf-8")
+        return Producto(id=prod_id, nombre=nombre, cantidad=cantidad, precio=precio)
+
+    def __iter__(self) -> Iterator[Producto]:
+        # Recorrido secuencial: se copia el blob de nombres una vez y se
+        # evita la indirección de _producto por registro.
+        nombres = self._mapa[self._inicio_nombres:]
+        registros = memoryview(self._mapa)[_CABECERA.size:self._inicio_nombres]
+        try:
+            for prod_id, cantidad, precio, desde, largo in _REGISTRO.iter_unpack(registros):
+                yield Producto(prod_id, nombres[desde:desde + largo].decode("utf-8"), cantidad, precio)
+        finally:
+            registros.release()
+
+    def buscar(self, prod_id: int) -> Optional[Producto]:
+        bajo, alto = 0, self._total - 1
+        while bajo <= alto:
+            medio = (bajo + alto) // 2
+            registro = _REGISTRO.unpack_from(self._mapa, _CABECERA.size + medio * _REGISTRO.size)
+            if registro[0] == prod_id:
+                return self._producto(registro)
+            if registro[0] < prod_id:
+                bajo = medio + 1
             else:
-                print("Opción inválida.")
-    finally:
-        inv.cerrar()
-
-if __name__ == '__main__':
-    menu()
-
-
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
+                alto = medio - 1
+        return None
 
-"""
-Sistema Avanzado de Gestión de Inventario (Consola + SQLite)
--------------------------------------------------------------
-Características:
-- POO: clases Producto e Inventario
-- Colecciones: diccionario para cache local (id -> Producto)
-- CRUD completo sincronizado con SQLite
-- Menú interactivo por consola
-
-Uso:
-    python inventory_app.py
-"""
-
-import sqlite3
-from dataclasses import dataclass
-from typing import Dict, List, Optional
-
-DB_NAME = "inventario.db"
+    def cerrar(self) -> None:
+        self._mapa.close()
+        self._archivo.close()
+
+
+def escribir_snapshot(ruta: str, productos: Iterator[Producto], ultimo_cambio: int) -> None:
+    """Escribe de forma atómica un snapshot de `productos` (ordenados por id).
+
+    `ultimo_cambio` es el seq de productos_cambios hasta el que `productos`
+    está al día; lo confirmado después se aplica al abrir el snapshot.
+    """
+    tmp = ruta + ".tmp"
+    nombres = bytearray()
+    total = 0
+    crc = 0
+    with open(tmp, "wb") as f:
+        f.write(b"\0" * _CABECERA.size)
+        for p in productos:
+            nombre = p.nombre.encode("utf-8")
+            registro = _REGISTRO.pack(p.id, p.cantidad, p.precio, len(nombres), len(nombre))
+            crc = zlib.crc32(registro, crc)
+            f.write(registro)
+            nombres += nombre
+            total += 1
+        crc = zlib.crc32(nombres, crc)
+        f.write(nombres)
+        f.seek(0)
+        f.write(_CABECERA.pack(SNAPSHOT_MAGIA, SNAPSHOT_VERSION, ultimo_cambio, total, crc))
+    os.replace(tmp, ruta)
 
 # =========================
-#   MODELO DE DOMINIO
+#      CONCURRENCIA
 # =========================
-@dataclass
-class Producto:
-    id: Optional[int]
-    nombre: str
-    cantidad: int
-    precio: float
-
-    def get_id(self) -> Optional[int]:
-        return self.id
-
-    def set_id(self, nuevo_id: int) -> None:
-        self.id = nuevo_id
-
-    def get_nombre(self) -> str:
-        return self.nombre
-
-    def set_nombre(self, nuevo_nombre: str) -> None:
-        self.nombre = nuevo_nombre
-
-    def get_cantidad(self) -> int:
-        return self.cantidad
+class PoolLectores:
+    """Conexiones de solo lectura compartibles entre hilos.
+
+    Con WAL los lectores no esperan al escritor: cada uno ve la última
+    transacción confirmada al empezar su consulta.
+    """
+
+    def __init__(self, db_path: str, tamanio: int = NUM_LECTORES) -> None:
+        self._libres: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._todas = []
+        uri = f"file:{os.path.abspath(db_path)}?mode=ro"
+        for _ in range(tamanio):
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            for pragma in PRAGMAS_CONCURRENTE[1:]:
+                conn.execute(pragma)
+            self._todas.append(conn)
+            self._libres.put(conn)
+
+    @contextmanager
+    def conexion(self) -> Iterator[sqlite3.Connection]:
+        conn = self._libres.get()
+        try:
+            yield conn
+        finally:
+            self._libres.put(conn)
 
-    def set_cantidad(self, nueva_cantidad: int) -> None:
-        if nueva_cantidad < 0:
-            raise ValueError("La cantidad no puede ser negativa.")
-        self.cantidad = nueva_cantidad
+    def cerrar(self) -> None:
+        for conn in self._todas:
+            conn.close()
+        self._todas.clear()
 
-    def get_precio(self) -> float:
-        return self.precio
 
-    def set_precio(self, nuevo_precio: float) -> None:
-        if nuevo_precio < 0:
-            raise ValueError("El precio no puede ser negativo.")
-        self.precio = nuevo_precio
+class _StockInsuficiente(Exception):
+    """Señal interna para deshacer un lote de ajustes incompleto."""
 
-    def actualizar_cantidad(self, delta: int) -> None:
-        nueva = self.cantidad + delta
-        if nueva < 0:
-            raise ValueError("La cantidad resultante no puede ser negativa.")
-        self.cantidad = nueva
 
-    def to_row(self) -> tuple:
-        return (self.nombre, self.cantidad, self.precio)
+def _con_escritor(metodo):
+    """Serializa el uso de la conexión de escritura (y del cache) entre hilos."""
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        with self._escritor:
+            return metodo(self, *args, **kwargs)
+    return envoltura
 
 # =========================
 #        INVENTARIO
 # =========================
 class Inventario:
-    def __init__(self, db_path: str = DB_NAME) -> None:
+    """Inventario sincronizado con SQLite.
+
+    `productos` es una propiedad: antes de devolver el cache se comprueba
+    `PRAGMA data_version` y, si otra conexión confirmó cambios, se aplican
+    solo las filas registradas en `productos_cambios` desde la última lectura.
+
+    Con `concurrente=True` la base pasa a WAL, la instancia se puede compartir
+    entre hilos (una única conexión de escritura protegida por un lock) y
+    `buscar_por_nombre` y los reportes usan un pool de lectores.
+    """
+
+    def __init__(self, db_path: str = DB_NAME, *, perezoso: bool = False,
+                 tam_cache: int = TAM_CACHE_LRU, usar_snapshot: bool = False,
+                 concurrente: bool = False, lectores: int = NUM_LECTORES) -> None:
         self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
+        self.perezoso = perezoso
+        self.ruta_snapshot = db_path + ".snap" if usar_snapshot else None
+        self._escritor = threading.RLock()
+        self._en_grupo = False
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=not concurrente)
         self.conn.row_factory = sqlite3.Row
+        if concurrente:
+            for pragma in PRAGMAS_CONCURRENTE:
+                self.conn.execute(pragma)
         self._crear_tabla()
-        self.productos: Dict[int, Producto] = {}
-        self._cargar_cache()
+        # lectores=0 deja todas las lecturas en la conexión de escritura.
+        self._lectores: Optional[PoolLectores] = None
+        if concurrente and lectores > 0:
+            self._lectores = PoolLectores(self.db_path, lectores)
+        self._snapshot: Optional[Snapshot] = None
+        if self.ruta_snapshot:
+            self._snapshot = Snapshot.abrir(self.ruta_snapshot)
+        # data_version antes que el log: un commit ajeno posterior a la
+        # lectura del log cambia la versión y lo recoge el próximo _sincronizar.
+        self._data_version = self._leer_data_version()
+        self._ultimo_cambio = self._leer_ultimo_cambio()
+        if self._snapshot is not None:
+            if self._snapshot.ultimo_cambio > self._ultimo_cambio:
+                # El log es anterior al snapshot: otra base o una copia restaurada.
+                self._invalidar_snapshot()
+            else:
+                self._ultimo_cambio = self._snapshot.ultimo_cambio
+        self._productos: MutableMapping[int, Producto]
+        if perezoso:
+            self._productos = CacheLRU(self._cargar_uno, tam_cache)
+        else:
+            self._productos = {}
+            self._cargar_cache()
+        if self._snapshot is not None:
+            # Lo confirmado después de escribir el snapshot (o mientras se abría)
+            self._aplicar_cambios()
+
+    @property
+    def productos(self) -> MutableMapping[int, Producto]:
+        self._sincronizar()
+        return self._productos
 
     def _crear_tabla(self) -> None:
-        self.conn.execute(
+        self.conn.executescript(
             """
             CREATE TABLE IF NOT EXISTS productos (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 nombre TEXT NOT NULL,
                 cantidad INTEGER NOT NULL CHECK (cantidad >= 0),
                 precio REAL NOT NULL CHECK (precio >= 0)
-            )
+            );
+            CREATE TABLE IF NOT EXISTS productos_cambios (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id_producto INTEGER NOT NULL
+            );
+            CREATE TRIGGER IF NOT EXISTS productos_cambios_ai AFTER INSERT ON productos
+            BEGIN
+                INSERT INTO productos_cambios (id_producto) VALUES (NEW.id);
+            END;
+            CREATE TRIGGER IF NOT EXISTS productos_cambios_au AFTER UPDATE ON productos
+            BEGIN
+                INSERT INTO productos_cambios (id_producto) VALUES (NEW.id);
+                INSERT INTO productos_cambios (id_producto) SELECT OLD.id WHERE OLD.id <> NEW.id;
+            END;
+            CREATE TRIGGER IF NOT EXISTS productos_cambios_ad AFTER DELETE ON productos
+            BEGIN
+                INSERT INTO productos_cambios (id_producto) VALUES (OLD.id);
+            END;
             """
         )
         self.conn.commit()
 
+    def _leer_data_version(self) -> int:
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _leer_ultimo_cambio(self) -> int:
+        return self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM productos_cambios").fetchone()[0]
+
+    @_con_escritor
+    def _sincronizar(self) -> None:
+        """Aplica al cache los cambios confirmados por otras conexiones."""
+        version = self._leer_data_version()
+        if version == self._data_version:
+            return
+        self._data_version = version
+        self._aplicar_cambios()
+
+    def _aplicar_cambios(self) -> None:
+        """Refresca las filas registradas en el log después de `_ultimo_cambio`."""
+        cambios = self.conn.execute(
+            "SELECT seq, id_producto FROM productos_cambios WHERE seq > ? ORDER BY seq",
+            (self._ultimo_cambio,),
+        ).fetchall()
+        if not cambios:
+            return
+        self._invalidar_snapshot()
+        if cambios[0]["seq"] != self._ultimo_cambio + 1:
+            # El log se podó por delante de nosotros: no queda otra que recargar.
+            self._ultimo_cambio = cambios[-1]["seq"]
+            self._cargar_cache()
+            return
+        self._ultimo_cambio = cambios[-1]["seq"]
+        self._refrescar_ids({row["id_producto"] for row in cambios})
+
+    def _refrescar_ids(self, ids: set) -> None:
+        if isinstance(self._productos, CacheLRU):
+            for prod_id in ids:
+                self._productos.descartar(prod_id)
+            return
+        pendientes = list(ids)
+        vistos = set()
+        # Lotes por debajo del límite de variables de SQLite.
+        for i in range(0, len(pendientes), 500):
+            lote = pendientes[i:i + 500]
+            marcas = ", ".join("?" * len(lote))
+            for row in self.conn.execute(
+                f"SELECT id, nombre, cantidad, precio FROM productos WHERE id IN ({marcas})", lote
+            ):
+                vistos.add(row["id"])
+                actual = self._productos.get(row["id"])
+                if actual is None:
+                    self._productos[row["id"]] = _producto_desde_fila(row)
+                else:
+                    actual.nombre = row["nombre"]
+                    actual.cantidad = row["cantidad"]
+                    actual.precio = row["precio"]
+        for prod_id in ids - vistos:
+            self._productos.pop(prod_id, None)
+
+    def _podar_log_cambios(self) -> None:
+        minimo, maximo = self.conn.execute(
+            "SELECT MIN(seq), MAX(seq) FROM productos_cambios").fetchone()
+        if maximo is None or maximo - minimo < 2 * LIMITE_LOG_CAMBIOS:
+            return
+        self.conn.execute("DELETE FROM productos_cambios WHERE seq <= ?",
+                          (maximo - LIMITE_LOG_CAMBIOS,))
+        self.conn.commit()
+        self._invalidar_snapshot()
+
     def _cargar_cache(self) -> None:
-        self.productos.clear()
+        self._productos.clear()
+        if isinstance(self._productos, CacheLRU):
+            return
+        if self._snapshot is not None:
+            for prod in self._snapshot:
+                self._productos[prod.id] = prod
+            return
         for row in self.conn.execute("SELECT id, nombre, cantidad, precio FROM productos"):
-            prod = Producto(id=row["id"], nombre=row["nombre"],
-                            cantidad=row["cantidad"], precio=row["precio"])
-            self.productos[prod.id] = prod
-
+            prod = _producto_desde_fila(row)
+            self._productos[prod.id] = prod
+
+    def _invalidar_snapshot(self) -> None:
+        if self._snapshot is not None:
+            self._snapshot.cerrar()
+            self._snapshot = None
+
+    @_con_escritor
+    def _cargar_uno(self, prod_id: int) -> Optional[Producto]:
+        if self._snapshot is not None:
+            return self._snapshot.buscar(prod_id)
+        row = self.conn.execute(
+            "SELECT id, nombre, cantidad, precio FROM productos WHERE id = ?",
+            (prod_id,),
+        ).fetchone()
+        return _producto_desde_fila(row) if row else None
+
+    @_con_escritor
+    def _cargar_pagina(self, despues_de: int, limite: int) -> List[Producto]:
+        self._sincronizar()
+        filas = self.conn.execute(
+            "SELECT id, nombre, cantidad, precio FROM productos WHERE id > ? ORDER BY id LIMIT ?",
+            (despues_de, limite),
+        ).fetchall()
+        pagina = []
+        for row in filas:
+            prod_id = row["id"]
+            # Si el producto ya está caliente se devuelve la misma instancia
+            # para no tener dos copias divergentes del mismo id, actualizada
+            # con la fila recién leída (puede ser más nueva que el cache).
+            if isinstance(self._productos, CacheLRU) and self._productos.en_memoria(prod_id):
+                actual = self._productos[prod_id]
+                actual.nombre = row["nombre"]
+                actual.cantidad = row["cantidad"]
+                actual.precio = row["precio"]
+                pagina.append(actual)
+            else:
+                pagina.append(_producto_desde_fila(row))
+        return pagina
+
+    @contextmanager
+    def _atomico(self, inmediato: bool = False) -> Iterator[None]:
+        """Confirma una operación de escritura, o la deshace si falla.
+
+        Dentro de `transaccion()` no se confirma nada: la operación queda en
+        un SAVEPOINT y un error solo deshace esa operación.
+        """
+        if self._en_grupo:
+            self.conn.execute("SAVEPOINT operacion")
+            try:
+                yield
+            except BaseException:
+                self.conn.execute("ROLLBACK TO operacion")
+                self.conn.execute("RELEASE operacion")
+                raise
+            self.conn.execute("RELEASE operacion")
+            return
+        try:
+            if inmediato:
+                self.conn.execute("BEGIN IMMEDIATE")
+            yield
+            ultimo = self._log_propio()
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        if ultimo is not None:
+            self._ultimo_cambio = ultimo
+
+    def _log_propio(self) -> Optional[int]:
+        """Posición del log que ya refleja el cache, leída antes de confirmar.
+
+        Con la escritura en curso ningún otro proceso puede confirmar; si
+        `data_version` no cambió desde la última sincronización, todo lo que
+        hay en el log después de `_ultimo_cambio` lo escribió esta instancia y
+        no hace falta releerlo.
+        """
+        if not self.conn.in_transaction or self._leer_data_version() != self._data_version:
+            return None
+        return self._leer_ultimo_cambio()
+
+    @contextmanager
+    def transaccion(self) -> Iterator["Inventario"]:
+        """Agrupa varias escrituras en una sola transacción SQLite.
+
+        Si la transacción no llega a confirmarse, el cache se recarga para no
+        quedar con cambios que la base descartó.
+        """
+        with self._escritor:
+            if self._en_grupo:
+                yield self
+                return
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._en_grupo = True
+            try:
+                yield self
+                ultimo = self._log_propio()
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                self._cargar_cache()
+                raise
+            finally:
+                self._en_grupo = False
+            if ultimo is not None:
+                self._ultimo_cambio = ultimo
+
+    @_con_escritor
     def agregar(self, producto: Producto) -> int:
-        cur = self.conn.execute(
-            "INSERT INTO productos (nombre, cantidad, precio) VALUES (?, ?, ?)",
-            producto.to_row(),
-        )
-        self.conn.commit()
+        with self._atomico():
+            cur = self.conn.execute(
+                "INSERT INTO productos (nombre, cantidad, precio) VALUES (?, ?, ?)",
+                producto.to_row(),
+            )
+        self._invalidar_snapshot()
         new_id = cur.lastrowid
         producto.set_id(new_id)
-        self.productos[new_id] = producto
+        self._productos[new_id] = producto
         return new_id
 
+    @_con_escritor
     def eliminar(self, prod_id: int) -> bool:
-        cur = self.conn.execute("DELETE FROM productos WHERE id = ?", (prod_id,))
-        self.conn.commit()
+        with self._atomico():
+            cur = self.conn.execute("DELETE FROM productos WHERE id = ?", (prod_id,))
+        self._invalidar_snapshot()
         eliminado = cur.rowcount > 0
         if eliminado:
-            self.productos.pop(prod_id, None)
+            self._productos.pop(prod_id, None)
         return eliminado
 
+    @_con_escritor
     def actualizar(self, prod_id: int, *, nombre: Optional[str] = None,
                    cantidad: Optional[int] = None, precio: Optional[float] = None) -> bool:
         if prod_id not in self.productos:
@@ -438,11 +653,12 @@ class Inventario:
 
         valores.append(prod_id)
         sql = f"UPDATE productos SET {', '.join(campos)} WHERE id = ?"
-        cur = self.conn.execute(sql, tuple(valores))
-        self.conn.commit()
+        with self._atomico():
+            cur = self.conn.execute(sql, tuple(valores))
+        self._invalidar_snapshot()
 
         if cur.rowcount > 0:
-            p = self.productos[prod_id]
+            p = self._productos[prod_id]
             if nombre is not None:
                 p.set_nombre(nombre)
             if cantidad is not None:
@@ -452,20 +668,142 @@ class Inventario:
             return True
         return False
 
+    def _reconciliar_cantidad(self, prod_id: int, cantidad: int) -> None:
+        if isinstance(self._productos, CacheLRU):
+            if not self._productos.en_memoria(prod_id):
+                return
+            p = self._productos[prod_id]
+        else:
+            p = self._productos.get(prod_id)
+            if p is None:
+                return
+        p.cantidad = cantidad
+
+    def _ajustar_en_transaccion(self, prod_id: int, delta: int) -> Optional[int]:
+        # La condición va en el propio UPDATE: dos vendedores concurrentes no
+        # pueden dejar el stock en negativo ni pisarse el valor leído.
+        cur = self.conn.execute(
+            "UPDATE productos SET cantidad = cantidad + ? WHERE id = ? AND cantidad + ? >= 0",
+            (delta, prod_id, delta),
+        )
+        if cur.rowcount == 0:
+            return None
+        return self.conn.execute(
+            "SELECT cantidad FROM productos WHERE id = ?", (prod_id,)).fetchone()[0]
+
+    @_con_escritor
+    def ajustar_stock(self, prod_id: int, delta: int) -> Optional[int]:
+        """Suma `delta` (negativo para vender) al stock de forma atómica.
+
+        Devuelve la cantidad resultante, o None si el producto no existe o
+        el stock no alcanza.
+        """
+        with self._atomico():
+            nueva = self._ajustar_en_transaccion(prod_id, delta)
+        if nueva is None:
+            return None
+        self._invalidar_snapshot()
+        self._reconciliar_cantidad(prod_id, nueva)
+        return nueva
+
+    @_con_escritor
+    def ajustar_stock_lote(self, ajustes: Dict[int, int]) -> Optional[Dict[int, int]]:
+        """Aplica varios ajustes en una sola transacción, todos o ninguno.
+
+        Devuelve id -> cantidad resultante, o None si algún ajuste no se pudo
+        aplicar (en ese caso no se modifica nada).
+        """
+        if not ajustes:
+            return {}
+        resultado = {}
+        try:
+            with self._atomico(inmediato=True):
+                for prod_id in sorted(ajustes):
+                    nueva = self._ajustar_en_transaccion(prod_id, ajustes[prod_id])
+                    if nueva is None:
+                        raise _StockInsuficiente(prod_id)
+                    resultado[prod_id] = nueva
+        except _StockInsuficiente:
+            return None
+        self._invalidar_snapshot()
+        for prod_id, nueva in resultado.items():
+            self._reconciliar_cantidad(prod_id, nueva)
+        return resultado
+
+    @contextmanager
+    def _lectura(self) -> Iterator[sqlite3.Connection]:
+        if self._lectores is not None:
+            with self._lectores.conexion() as conn:
+                yield conn
+        else:
+            with self._escritor:
+                yield self.conn
+
     def buscar_por_nombre(self, texto: str) -> List[Producto]:
         patron = f"%{texto.strip()}%"
-        filas = self.conn.execute(
-            "SELECT id, nombre, cantidad, precio FROM productos WHERE nombre LIKE ? COLLATE NOCASE",
-            (patron,),
-        ).fetchall()
+        with self._lectura() as conn:
+            filas = conn.execute(
+                "SELECT id, nombre, cantidad, precio FROM productos WHERE nombre LIKE ? COLLATE NOCASE",
+                (patron,),
+            ).fetchall()
         return [Producto(row["id"], row["nombre"], row["cantidad"], row["precio"]) for row in filas]
 
-    def listar_todos(self) -> List[Producto]:
-        return list(self.productos.values())
+    def stock_bajo(self, umbral: int) -> List[Producto]:
+        with self._lectura() as conn:
+            filas = conn.execute(
+                "SELECT id, nombre, cantidad, precio FROM productos WHERE cantidad <= ? ORDER BY cantidad, id",
+                (umbral,),
+            ).fetchall()
+        return [_producto_desde_fila(row) for row in filas]
+
+    def valor_total(self) -> float:
+        with self._lectura() as conn:
+            return conn.execute(
+                "SELECT COALESCE(SUM(cantidad * precio), 0) FROM productos").fetchone()[0]
+
+    def listar_todos(self, tam_pagina: int = TAM_PAGINA) -> Iterator[Producto]:
+        """Itera todos los productos ordenados por id, de a `tam_pagina`.
+
+        En modo perezoso cada página se lee de SQLite con paginación por
+        clave, por lo que la memoria no crece con el tamaño de la tabla.
+        """
+        if not self.perezoso:
+            yield from list(self.productos.values())
+            return
+        ultimo_id = 0
+        while True:
+            pagina = self._cargar_pagina(ultimo_id, tam_pagina)
+            if not pagina:
+                return
+            yield from pagina
+            ultimo_id = pagina[-1].id
 
+    @_con_escritor
     def cerrar(self) -> None:
+        self._sincronizar()
+        self._podar_log_cambios()
+        if self._lectores is not None:
+            self._lectores.cerrar()
+        if self._snapshot is not None:
+            self._snapshot.cerrar()
+            self._snapshot = None
+        elif self.ruta_snapshot:
+            # El seq se toma antes de leer los datos: lo que otro proceso
+            # confirme mientras se serializa queda en el log por encima de él
+            # y se vuelve a aplicar al abrir el snapshot.
+            if self.perezoso:
+                ultimo = self._leer_ultimo_cambio()
+                filas = self.conn.execute(
+                    "SELECT id, nombre, cantidad, precio FROM productos ORDER BY id")
+                productos = (_producto_desde_fila(row) for row in filas)
+            else:
+                # El cache está al día hasta _ultimo_cambio (recién sincronizado)
+                ultimo = self._ultimo_cambio
+                productos = iter(sorted(self._productos.values(), key=lambda p: p.id))
+            escribir_snapshot(self.ruta_snapshot, productos, ultimo)
         self.conn.close()
 
+
 # =========================
 #        UI CONSOLA
 # =========================
@@ -491,8 +829,8 @@ def pedir_float(msg: str, *, minimo: Optional[float] = None) -> float:
         except ValueError:
             print("Ingrese un número válido (use punto decimal).")
 
-def menu() -> None:
-    inv = Inventario()
+def menu(perezoso: bool = False) -> None:
+    inv = Inventario(perezoso=perezoso)
     print("✅ Inventario listo. Base de datos:", inv.db_path)
 
     opciones = {
@@ -501,6 +839,7 @@ def menu() -> None:
         "3": "Actualizar producto",
         "4": "Buscar por nombre",
         "5": "Mostrar todos",
+        "6": "Ajustar stock (+/-)",
         "0": "Salir",
     }
 
@@ -566,13 +905,23 @@ def menu() -> None:
                         print(f"- ID={p.id} | {p.nombre} | Cant={p.cantidad} | Precio={p.precio:.2f}")
 
             elif op == "5":
-                items = inv.listar_todos()
-                if not items:
+                hay_items = False
+                for p in inv.listar_todos():
+                    if not hay_items:
+                        print("Productos en inventario:")
+                        hay_items = True
+                    print(f"- ID={p.id} | {p.nombre} | Cant={p.cantidad} | Precio={p.precio:.2f}")
+                if not hay_items:
                     print("Inventario vacío.")
+
+            elif op == "6":
+                pid = pedir_int("ID a ajustar: ", minimo=1)
+                delta = pedir_int("Cantidad a sumar (negativa para restar): ")
+                nueva = inv.ajustar_stock(pid, delta)
+                if nueva is None:
+                    print("✖ No existe ese ID o el stock no alcanza.")
                 else:
-                    print("Productos en inventario:")
-                    for p in items:
-                        print(f"- ID={p.id} | {p.nombre} | Cant={p.cantidad} | Precio={p.precio:.2f}")
+                    print(f"✔ Stock actualizado: {nueva}.")
 
             elif op == "0":
                 print("Hasta pronto 👋")
@@ -583,5 +932,4 @@ def menu() -> None:
         inv.cerrar()
 
 if __name__ == '__main__':
-    menu()
-
+    menu(perezoso="--perezoso" in sys.argv[1:])
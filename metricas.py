@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+
+"""
+Métricas de la tienda en formato de texto de Prometheus
+--------------------------------------------------------
+- Latencia por endpoint (histograma) y peticiones por código de estado
+- Número y tiempo total de sentencias SQL, globales y por petición
+- Tiempo de generación del PDF de factura
+- Tamaño de la cookie de sesión y del carrito
+
+Todo se acumula en memoria con un lock por métrica; registrar un valor es
+un par de sumas, por lo que puede quedar activo siempre.
+
+Uso:
+    from metricas import init_metricas
+    init_metricas(app)          # expone GET /metrics
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+from flask.globals import request_ctx
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONTEO = (0, 1, 2, 5, 10, 20, 50, 100)
+BUCKETS_BYTES = (256, 512, 1024, 2048, 4096)
+
+
+class Contador:
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, valor=1.0, *etiquetas):
+        with self._lock:
+            self._valores[etiquetas] = self._valores.get(etiquetas, 0.0) + valor
+
+    def lineas(self):
+        with self._lock:
+            valores = list(self._valores.items())
+        for etiquetas, valor in valores:
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, etiquetas)} {_numero(valor)}"
+
+
+class Indicador:
+    """Valor que sube y baja (gauge), p. ej. filas de una tabla."""
+
+    tipo = "gauge"
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def fijar(self, valor, *etiquetas):
+        with self._lock:
+            self._valores[etiquetas] = float(valor)
+
+    def lineas(self):
+        with self._lock:
+            valores = list(self._valores.items())
+        for etiquetas, valor in valores:
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, etiquetas)} {_numero(valor)}"
+
+
+class Histograma:
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, buckets, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = tuple(sorted(buckets))
+        self.etiquetas = tuple(etiquetas)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *etiquetas):
+        # Se guarda el conteo por bucket (no acumulado) y se acumula al exportar.
+        i = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][i] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def lineas(self):
+        with self._lock:
+            series = [(k, (list(v[0]), v[1], v[2])) for k, v in self._series.items()]
+        for etiquetas, (conteos, suma, total) in series:
+            acumulado = 0
+            for limite, n in zip(self.buckets + (float("inf"),), conteos):
+                acumulado += n
+                le = "+Inf" if limite == float("inf") else _numero(limite)
+                yield (f"{self.nombre}_bucket"
+                       f"{_etiquetas(self.etiquetas + ('le',), etiquetas + (le,))} {acumulado}")
+            yield f"{self.nombre}_sum{_etiquetas(self.etiquetas, etiquetas)} {_numero(suma)}"
+            yield f"{self.nombre}_count{_etiquetas(self.etiquetas, etiquetas)} {total}"
+
+
+def _numero(valor):
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(nombres, valores):
+    if not nombres:
+        return ""
+    return "{" + ",".join(f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)) + "}"
+
+
+# ---------------------------
+# Registro global
+# ---------------------------
+LATENCIA = Histograma("http_request_duration_seconds", "Latencia de las peticiones por endpoint.",
+                      BUCKETS_LATENCIA, ("endpoint", "method"))
+PETICIONES = Contador("http_requests_total", "Peticiones atendidas.", ("endpoint", "method", "status"))
+SQL_SENTENCIAS = Contador("sql_statements_total", "Sentencias SQL ejecutadas.", ("endpoint",))
+SQL_SEGUNDOS = Contador("sql_statements_seconds_total", "Tiempo total en sentencias SQL.", ("endpoint",))
+SQL_POR_PETICION = Histograma("sql_statements_per_request", "Sentencias SQL por petición.",
+                              BUCKETS_CONTEO, ("endpoint",))
+PDF_SEGUNDOS = Histograma("factura_pdf_render_seconds", "Tiempo de pisa.CreatePDF en factura.",
+                          BUCKETS_LATENCIA)
+SESION_BYTES = Histograma("session_cookie_bytes", "Tamaño de la cookie de sesión modificada.",
+                          BUCKETS_BYTES)
+CARRITO_ITEMS = Histograma("cart_items", "Productos distintos en el carrito al responder.",
+                           BUCKETS_CONTEO)
+
+METRICAS = [LATENCIA, PETICIONES, SQL_SENTENCIAS, SQL_SEGUNDOS, SQL_POR_PETICION,
+            PDF_SEGUNDOS, SESION_BYTES, CARRITO_ITEMS]
+
+
+# Funciones que refrescan indicadores justo antes de exportar (p. ej. tamaños
+# de tablas); cada una decide si su valor en memoria sigue vigente.
+_AL_EXPORTAR = []
+
+
+def al_exportar(funcion):
+    if funcion not in _AL_EXPORTAR:  # create_app() puede llamarse varias veces
+        _AL_EXPORTAR.append(funcion)
+    return funcion
+
+
+def exportar():
+    for funcion in _AL_EXPORTAR:
+        funcion()
+    salida = []
+    for m in METRICAS:
+        salida.append(f"# HELP {m.nombre} {m.ayuda}")
+        salida.append(f"# TYPE {m.nombre} {m.tipo}")
+        salida.extend(m.lineas())
+    return "\n".join(salida) + "\n"
+
+
+@contextmanager
+def medir_pdf():
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        PDF_SEGUNDOS.observar(time.perf_counter() - inicio)
+
+
+# ---------------------------
+# Integración con Flask / SQLAlchemy
+# ---------------------------
+def _endpoint_actual():
+    try:
+        return request.endpoint or "desconocido"
+    except RuntimeError:  # fuera de una petición (migraciones, scripts)
+        return "fuera_de_peticion"
+
+
+def _antes_de_sql(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inicio_sql", []).append(time.perf_counter())
+
+
+def _despues_de_sql(conn, cursor, statement, parameters, context, executemany):
+    pila = conn.info.get("inicio_sql")
+    if not pila:
+        return
+    duracion = time.perf_counter() - pila.pop()
+    endpoint = _endpoint_actual()
+    SQL_SENTENCIAS.inc(1, endpoint)
+    SQL_SEGUNDOS.inc(duracion, endpoint)
+    try:
+        g.sql_sentencias = g.get("sql_sentencias", 0) + 1
+    except RuntimeError:
+        pass
+
+
+_sql_registrado = False
+
+
+def _registrar_eventos_sql():
+    global _sql_registrado
+    if _sql_registrado:
+        return
+    event.listen(Engine, "before_cursor_execute", _antes_de_sql)
+    event.listen(Engine, "after_cursor_execute", _despues_de_sql)
+    _sql_registrado = True
+
+
+# Endpoints que nunca usan la sesión: ni siquiera se mira si la usaron
+SIN_SESION = ("static", "asset")
+
+
+def _sesion_sin_marcar():
+    """La sesión de la petición sin marcarla como usada.
+
+    En Flask reciente pasar por el proxy `session` (aunque sea para leer
+    `accessed`) ya la marca; se toma directo del contexto.
+    """
+    ctx = request_ctx._get_current_object()
+    sesion = getattr(ctx, "_session", None)
+    return ctx.session if sesion is None else sesion
+
+
+def init_metricas(app, ruta="/metrics"):
+    _registrar_eventos_sql()
+
+    @app.before_request
+    def _inicio_peticion():
+        g.inicio_peticion = time.perf_counter()
+
+    @app.after_request
+    def _fin_peticion(response):
+        inicio = g.pop("inicio_peticion", None)
+        if inicio is None:
+            return response
+        endpoint = request.endpoint or "desconocido"
+        if endpoint == "metricas":
+            return response
+        LATENCIA.observar(time.perf_counter() - inicio, endpoint, request.method)
+        PETICIONES.inc(1, endpoint, request.method, response.status_code)
+        SQL_POR_PETICION.observar(g.get("sql_sentencias", 0), endpoint)
+        # Tocar la sesión acá haría que Flask agregue Vary: Cookie a cualquier
+        # respuesta (assets incluidos, que dejarían de cachearse en proxies y
+        # CDN): solo se mide si la vista ya la usó.
+        sesion = None if endpoint in SIN_SESION else _sesion_sin_marcar()
+        if sesion is None or not (sesion.accessed or sesion.modified):
+            return response
+        CARRITO_ITEMS.observar(len(sesion.get("carrito", {})))
+        if sesion.modified:
+            # La cookie se firma después de los after_request; se serializa
+            # igual que lo hará Flask para conocer su tamaño.
+            serializador = app.session_interface.get_signing_serializer(app)
+            if serializador is not None:
+                SESION_BYTES.observar(len(serializador.dumps(dict(sesion))))
+        return response
+
+    @app.route(ruta, endpoint="metricas")
+    def metricas():
+        return Response(exportar(), mimetype="text/plain; version=0.0.4")
+
+    return app
@@ -0,0 +1,56 @@
+"""Resúmenes de ventas por día, producto y usuario
+
+Revision ID: a3c9e5d1f702
+Revises: 6088023ae421
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c9e5d1f702'
+down_revision = '6088023ae421'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ventas_diarias',
+    sa.Column('fecha', sa.Date(), nullable=False),
+    sa.Column('compras', sa.Integer(), nullable=False),
+    sa.Column('unidades', sa.Integer(), nullable=False),
+    sa.Column('ingresos', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('fecha')
+    )
+    op.create_table('ventas_por_producto',
+    sa.Column('id_producto', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('nombre_producto', sa.String(length=100), nullable=False),
+    sa.Column('compras', sa.Integer(), nullable=False),
+    sa.Column('unidades', sa.Integer(), nullable=False),
+    sa.Column('ingresos', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id_producto')
+    )
+    with op.batch_alter_table('ventas_por_producto', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ventas_por_producto_unidades'), ['unidades'], unique=False)
+
+    op.create_table('ventas_por_usuario',
+    sa.Column('id_usuario', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('compras', sa.Integer(), nullable=False),
+    sa.Column('unidades', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('ultima_compra', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['id_usuario'], ['usuarios.id_usuario'], ),
+    sa.PrimaryKeyConstraint('id_usuario')
+    )
+    # Después de migrar: flask --app app ventas reconstruir
+
+
+def downgrade():
+    op.drop_table('ventas_por_usuario')
+    with op.batch_alter_table('ventas_por_producto', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ventas_por_producto_unidades'))
+
+    op.drop_table('ventas_por_producto')
+    op.drop_table('ventas_diarias')
@@ -0,0 +1,37 @@
+"""Outbox de eventos de compras
+
+Revision ID: b71f0c4e9a23
+Revises: a3c9e5d1f702
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71f0c4e9a23'
+down_revision = 'a3c9e5d1f702'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('outbox_eventos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tipo', sa.String(length=50), nullable=False),
+    sa.Column('id_agregado', sa.Integer(), nullable=False),
+    sa.Column('datos', sa.Text(), nullable=False),
+    sa.Column('creado', sa.DateTime(), nullable=False),
+    sa.Column('publicado', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('outbox_eventos', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_outbox_eventos_publicado'), ['publicado'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('outbox_eventos', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_outbox_eventos_publicado'))
+
+    op.drop_table('outbox_eventos')
@@ -0,0 +1,54 @@
+"""Tablas de archivo para compras antiguas
+
+Revision ID: c4d2a8f61b95
+Revises: b71f0c4e9a23
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d2a8f61b95'
+down_revision = 'b71f0c4e9a23'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('compras_archivo',
+    sa.Column('id_compra', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('id_usuario', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.DateTime(), nullable=True),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['id_usuario'], ['usuarios.id_usuario'], ),
+    sa.PrimaryKeyConstraint('id_compra')
+    )
+    with op.batch_alter_table('compras_archivo', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_compras_archivo_id_usuario'), ['id_usuario'], unique=False)
+
+    op.create_table('detalle_compra_archivo',
+    sa.Column('id_detalle', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('id_compra', sa.Integer(), nullable=False),
+    sa.Column('id_producto', sa.Integer(), nullable=False),
+    sa.Column('nombre_producto', sa.String(length=100), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.Column('precio', sa.Float(), nullable=False),
+    sa.Column('imagen', sa.String(length=100), nullable=False),
+    sa.ForeignKeyConstraint(['id_compra'], ['compras_archivo.id_compra'], ),
+    sa.PrimaryKeyConstraint('id_detalle')
+    )
+    with op.batch_alter_table('detalle_compra_archivo', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_detalle_compra_archivo_id_compra'), ['id_compra'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('detalle_compra_archivo', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_detalle_compra_archivo_id_compra'))
+
+    op.drop_table('detalle_compra_archivo')
+    with op.batch_alter_table('compras_archivo', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_compras_archivo_id_usuario'))
+
+    op.drop_table('compras_archivo')
@@ -0,0 +1,45 @@
+"""Stock del catálogo web y reservas de carrito
+
+Revision ID: d5e3b9a07c16
+Revises: c4d2a8f61b95
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e3b9a07c16'
+down_revision = 'c4d2a8f61b95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stock_productos',
+    sa.Column('id_producto', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.Column('reservada', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id_producto')
+    )
+    op.create_table('reservas_stock',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('id_usuario', sa.Integer(), nullable=False),
+    sa.Column('id_producto', sa.Integer(), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.Column('expira', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['id_usuario'], ['usuarios.id_usuario'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('id_usuario', 'id_producto')
+    )
+    with op.batch_alter_table('reservas_stock', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_reservas_stock_expira'), ['expira'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reservas_stock', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_reservas_stock_expira'))
+
+    op.drop_table('reservas_stock')
+    op.drop_table('stock_productos')
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+
+"""
+Outbox transaccional y feed de eventos de compras
+--------------------------------------------------
+finalizar_compra escribe un evento en la tabla outbox_eventos dentro de la
+misma transacción que la compra: o se confirman los dos o ninguno. Un relay
+los copia en lotes a un log JSONL de solo-anexar y los marca publicados.
+
+Los consumidores (contabilidad, reposición de stock...) leen el log, no las
+tablas de compras:
+- cada evento se identifica por su offset = posición en bytes de su línea;
+- FeedEventos.leer(desde) devuelve (offset, evento, siguiente) y el
+  consumidor guarda `siguiente` para continuar; desde=0 reproduce todo.
+
+Entrega al-menos-una-vez: si el relay cae entre escribir el log y marcar el
+lote, ese lote se vuelve a escribir. Los consumidores deben deduplicar por
+"id" (el id del evento en la outbox, único y estable).
+
+Un solo relay por log (el anexado no se coordina entre procesos).
+
+Comandos (flask --app app ...):
+    outbox relay [--lote 500] [--seguir]     # publica pendientes
+    outbox leer [--desde OFFSET] [--max N]   # imprime eventos con su offset
+    outbox purgar [--dias 7]                 # borra los ya publicados
+
+Configuración: OUTBOX_LOG (por defecto <instance>/eventos.jsonl)
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import click
+
+LOTE_RELAY = 500
+INTERVALO_RELAY = 1.0
+
+
+class OffsetInvalido(ValueError):
+    """El offset no apunta al comienzo de una línea del log."""
+
+
+class FeedEventos:
+    def __init__(self, ruta):
+        self.ruta = ruta
+
+    def anexar(self, eventos):
+        """Escribe `eventos` al final del log con un solo write + fsync; devuelve sus offsets."""
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        with open(self.ruta, "ab") as f:
+            inicio = self._descartar_cola(f)
+            offsets, lineas = [], []
+            for evento in eventos:
+                offsets.append(inicio + sum(len(l) for l in lineas))
+                lineas.append(json.dumps(evento, ensure_ascii=False, separators=(",", ":"),
+                                         default=str).encode("utf-8") + b"\n")
+            f.write(b"".join(lineas))
+            f.flush()
+            os.fsync(f.fileno())
+        return offsets
+
+    @staticmethod
+    def _descartar_cola(f):
+        """Trunca una última línea incompleta (relay caído a mitad de write)."""
+        fin = f.seek(0, os.SEEK_END)
+        if fin == 0:
+            return 0
+        with open(f.name, "rb") as lector:
+            pos = fin
+            while pos > 0:
+                paso = min(4096, pos)
+                lector.seek(pos - paso)
+                bloque = lector.read(paso)
+                if pos == fin and bloque.endswith(b"\n"):
+                    return fin
+                corte = bloque.rfind(b"\n")
+                if corte >= 0:
+                    pos = pos - paso + corte + 1
+                    break
+                pos -= paso
+        f.truncate(pos)
+        return f.seek(0, os.SEEK_END)
+
+    def fin(self):
+        try:
+            return os.path.getsize(self.ruta)
+        except FileNotFoundError:
+            return 0
+
+    def leer(self, desde=0, maximo=None):
+        """Itera (offset, evento, siguiente_offset) a partir de `desde`."""
+        try:
+            f = open(self.ruta, "rb")
+        except FileNotFoundError:
+            if desde:
+                raise OffsetInvalido(desde)
+            return
+        with f:
+            if desde:
+                f.seek(desde - 1)
+                if f.read(1) != b"\n":
+                    raise OffsetInvalido(desde)
+            offset = desde
+            leidos = 0
+            while maximo is None or leidos < maximo:
+                linea = f.readline()
+                # Una línea sin \n final es un anexado a medio escribir: se ignora
+                if not linea.endswith(b"\n"):
+                    return
+                siguiente = offset + len(linea)
+                yield offset, json.loads(linea), siguiente
+                offset = siguiente
+                leidos += 1
+
+
+class Outbox:
+    def __init__(self, db, modelo, feed):
+        self.db = db
+        self.Evento = modelo
+        self.feed = feed
+
+    def publicar(self, tipo, id_agregado, datos):
+        """Añade un evento a la transacción en curso (no hace commit)."""
+        evento = self.Evento(tipo=tipo, id_agregado=id_agregado,
+                             datos=json.dumps(datos, ensure_ascii=False, default=str),
+                             creado=datetime.utcnow())
+        self.db.session.add(evento)
+        return evento
+
+    def relay(self, lote=LOTE_RELAY):
+        """Publica un lote de pendientes en el log; devuelve cuántos publicó."""
+        E = self.Evento
+        sesion = self.db.session
+        pendientes = (sesion.query(E).filter(E.publicado.is_(None))
+                      .order_by(E.id).limit(lote).all())
+        if not pendientes:
+            sesion.rollback()
+            return 0
+        self.feed.anexar({"id": e.id, "tipo": e.tipo, "id_agregado": e.id_agregado,
+                          "creado": e.creado.isoformat(), "datos": json.loads(e.datos)}
+                         for e in pendientes)
+        ahora = datetime.utcnow()
+        sesion.query(E).filter(E.id.in_([e.id for e in pendientes])).update(
+            {E.publicado: ahora}, synchronize_session=False)
+        sesion.commit()
+        return len(pendientes)
+
+    def relay_todo(self, lote=LOTE_RELAY):
+        total = 0
+        while True:
+            n = self.relay(lote)
+            total += n
+            if n < lote:
+                return total
+
+    def purgar(self, dias):
+        """Borra eventos publicados hace más de `dias`; el log los conserva."""
+        E = self.Evento
+        limite = datetime.utcnow() - timedelta(days=dias)
+        n = (self.db.session.query(E).filter(E.publicado.isnot(None), E.publicado < limite)
+             .delete(synchronize_session=False))
+        self.db.session.commit()
+        return n
+
+
+def init_outbox(app, db, modelo):
+    ruta = app.config.get("OUTBOX_LOG", os.environ.get("OUTBOX_LOG")) \
+        or os.path.join(app.instance_path, "eventos.jsonl")
+    outbox = Outbox(db, modelo, FeedEventos(ruta))
+    app.extensions["outbox"] = outbox
+
+    @app.cli.group("outbox")
+    def grupo():
+        """Outbox de eventos de compras."""
+
+    @grupo.command("relay")
+    @click.option("--lote", default=LOTE_RELAY, show_default=True)
+    @click.option("--seguir", is_flag=True, help="No terminar: sondear la outbox cada --intervalo s.")
+    @click.option("--intervalo", default=INTERVALO_RELAY, show_default=True)
+    def relay(lote, seguir, intervalo):
+        """Publica los eventos pendientes en el log."""
+        while True:
+            n = outbox.relay_todo(lote)
+            if n or not seguir:
+                click.echo(f"✔ {n} eventos publicados en {ruta} (fin={outbox.feed.fin()})")
+            if not seguir:
+                return
+            time.sleep(intervalo)
+
+    @grupo.command("leer")
+    @click.option("--desde", default=0, show_default=True, help="Offset en bytes.")
+    @click.option("--max", "maximo", type=int, default=None)
+    def leer(desde, maximo):
+        """Imprime los eventos del log a partir de un offset."""
+        try:
+            for offset, evento, _ in outbox.feed.leer(desde, maximo):
+                click.echo(f"{offset}\t{json.dumps(evento, ensure_ascii=False)}")
+        except OffsetInvalido:
+            raise click.BadParameter(f"{desde} no es el comienzo de un evento", param_hint="--desde")
+
+    @grupo.command("purgar")
+    @click.option("--dias", default=7, show_default=True)
+    def purgar(dias):
+        """Borra de la tabla los eventos ya publicados."""
+        click.echo(f"✔ {outbox.purgar(dias)} eventos purgados")
+
+    return outbox
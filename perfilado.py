@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+"""
+Perfilado de SQL: log de consultas lentas y detector de N+1
+------------------------------------------------------------
+Se engancha al engine de `db` y, dentro de cada petición:
+- registra (logger "perfilado.sql") las sentencias que superan el umbral,
+  con sus parámetros y la ruta que las originó;
+- cuenta cuántas veces se repite la misma forma de sentencia (literales
+  reemplazados por ?) y avisa cuando pasa de N, lo típico de un N+1;
+  en modo test (app.testing) en lugar de avisar lanza ConsultaRepetidaError.
+
+Configuración (app.config o variables de entorno del mismo nombre):
+    PERFILADO_SQL                 activa el modo perfilado (por defecto no)
+    PERFILADO_UMBRAL_LENTO_MS     umbral de consulta lenta (100)
+    PERFILADO_MAX_REPETICIONES    repeticiones toleradas por petición (5)
+"""
+
+import logging
+import os
+import re
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger("perfilado.sql")
+
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_ESPACIOS = re.compile(r"\s+")
+_LISTAS_IN = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+
+class ConsultaRepetidaError(RuntimeError):
+    """La misma forma de sentencia se repitió demasiado en una petición."""
+
+
+def forma_sentencia(sql):
+    """Normaliza una sentencia para agrupar las que solo cambian en valores."""
+    forma = _LITERALES.sub("?", sql)
+    forma = _ESPACIOS.sub(" ", forma).strip()
+    return _LISTAS_IN.sub("(?)", forma)
+
+
+def _config(app, clave, defecto, tipo):
+    valor = app.config.get(clave, os.environ.get(clave))
+    if valor is None:
+        return defecto
+    if tipo is bool:
+        return str(valor).lower() in ("1", "true", "si", "sí", "yes")
+    return tipo(valor)
+
+
+def init_perfilado(app, db):
+    if not _config(app, "PERFILADO_SQL", False, bool):
+        return False
+    umbral = _config(app, "PERFILADO_UMBRAL_LENTO_MS", 100.0, float) / 1000.0
+    max_repeticiones = _config(app, "PERFILADO_MAX_REPETICIONES", 5, int)
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("perfilado_inicio", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        pila = conn.info.get("perfilado_inicio")
+        duracion = time.perf_counter() - pila.pop() if pila else 0.0
+        ruta = f"{request.method} {request.path}" if has_request_context() else "-"
+
+        if duracion >= umbral:
+            logger.warning("Consulta lenta (%.1f ms) en %s: %s | parámetros=%r",
+                           duracion * 1000, ruta, _ESPACIOS.sub(" ", statement), parameters)
+
+        if not has_request_context():
+            return
+        conteos = g.setdefault("perfilado_formas", {})
+        forma = forma_sentencia(statement)
+        conteos[forma] = conteos.get(forma, 0) + 1
+        if conteos[forma] == max_repeticiones + 1:
+            mensaje = (f"Posible N+1 en {ruta} ({request.endpoint}): la sentencia se repitió "
+                       f"más de {max_repeticiones} veces: {forma}")
+            if app.testing:
+                raise ConsultaRepetidaError(mensaje)
+            logger.warning(mensaje)
+
+    return True
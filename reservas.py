@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+
+"""
+Reservas de stock para el checkout web
+---------------------------------------
+Cada producto con fila en stock_productos tiene `cantidad` (en depósito) y
+`reservada` (suma de las reservas vivas). Lo disponible es la diferencia.
+
+- Agregar al carrito reserva por un rato (RESERVA_TTL_SEGUNDOS):
+      UPDATE stock SET reservada = reservada + q
+       WHERE id = ? AND cantidad - reservada >= q
+  Es un UPDATE condicional sobre UNA fila: dos checkouts de productos
+  distintos nunca se esperan, y dos del mismo producto solo lo que dura esa
+  sentencia. No hay ningún lock global.
+- Finalizar la compra convierte la reserva en descuento, también con un solo
+  UPDATE condicional por producto, dentro de la transacción de la compra.
+  Si la reserva venció (o el carrito pide más) se toma de lo disponible; si
+  no alcanza, la compra entera se deshace.
+- Un barrido en segundo plano libera las reservas vencidas.
+
+Quien borra una reserva (checkout, barrido, eliminar del carrito) lo hace con
+un DELETE que exige la cantidad leída; solo el que lo consigue (rowcount 1)
+devuelve esas unidades, así dos procesos nunca liberan la misma reserva.
+
+Vínculo con el inventario de consola (inventory_app.py), solo si se
+configura INVENTARIO_DB: los productos del catálogo se vinculan por nombre
+exacto y
+- cada compra descuenta también esas unidades del inventario, en un solo
+  ajustar_stock_lote antes de confirmar la transacción web; si el inventario
+  no alcanza la compra se rechaza, si está bloqueado por la consola se pide
+  reintentar, y si la transacción web falla después se devuelven;
+- el barrido copia además las cantidades del inventario a stock_productos,
+  así lo que cambie por consola llega a la web en RESERVA_BARRIDO_SEGUNDOS.
+
+Los productos sin fila en stock_productos no se controlan (como antes): sin
+inventario vinculado ni `stock fijar`, la web vende sin límite.
+
+Configuración (app.config o variables de entorno):
+    RESERVA_TTL_SEGUNDOS        vida de una reserva (900)
+    RESERVA_BARRIDO_SEGUNDOS    intervalo del barrido en segundo plano (30; 0 = sin hilo)
+    INVENTARIO_DB               base de inventory_app.py ("" = sin vínculo, por defecto)
+
+Comandos (flask --app app ...):
+    stock fijar ID CANTIDAD
+    stock importar [--inventario inventario.db]   # cantidades de inventory_app ahora
+    stock barrer
+    stock ver
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+TTL_RESERVA = 900
+INTERVALO_BARRIDO = 30
+LOTE_BARRIDO = 500
+ESPERA_INVENTARIO_MS = 1000  # cuánto espera un checkout si la consola tiene el inventario bloqueado
+
+logger = logging.getLogger("reservas")
+
+
+class InventarioOcupado(Exception):
+    """El inventario de consola siguió bloqueado más de ESPERA_INVENTARIO_MS."""
+
+
+class MotorReservas:
+    def __init__(self, db, stock, reserva, ttl=TTL_RESERVA):
+        self.db = db
+        self.Stock = stock
+        self.Reserva = reserva
+        self.ttl = ttl
+        self.inventario = None  # InventarioConsola, si hay uno vinculado
+
+    def _vence(self):
+        return datetime.utcnow() + timedelta(seconds=self.ttl)
+
+    def _controlado(self, id_producto):
+        return self.db.session.get(self.Stock, id_producto) is not None
+
+    # ---------------------------
+    # Carrito
+    # ---------------------------
+    def reservar(self, id_usuario, id_producto, cantidad=1):
+        """Reserva `cantidad` unidades más para el usuario y hace commit.
+
+        Devuelve False (sin cambiar nada) si no hay disponible suficiente.
+        """
+        S, R = self.Stock, self.Reserva
+        sesion = self.db.session
+        if not self._controlado(id_producto):
+            sesion.rollback()
+            return True
+
+        # Siempre reserva primero y stock después (como _quitar y confirmar):
+        # mismo orden de bloqueo en todos los caminos, sin interbloqueos.
+        vence = self._vence()
+        actualizar = (update(R).where(R.id_usuario == id_usuario, R.id_producto == id_producto)
+                      .values(cantidad=R.cantidad + cantidad, expira=vence))
+        if not sesion.execute(actualizar).rowcount:
+            try:
+                with sesion.begin_nested():
+                    sesion.add(R(id_usuario=id_usuario, id_producto=id_producto,
+                                 cantidad=cantidad, expira=vence))
+            except IntegrityError:
+                sesion.execute(actualizar)  # otra petición del mismo usuario la creó recién
+        tomado = sesion.execute(
+            update(S).where(S.id_producto == id_producto, S.cantidad - S.reservada >= cantidad)
+            .values(reservada=S.reservada + cantidad)).rowcount
+        if not tomado:
+            sesion.rollback()
+            return False
+        sesion.commit()
+        return True
+
+    def _quitar(self, filtro_reserva, id_producto, cantidad):
+        """Resta hasta `cantidad` de una reserva y devuelve cuántas unidades liberó."""
+        S, R = self.Stock, self.Reserva
+        sesion = self.db.session
+        fila = sesion.execute(select(R.id, R.cantidad).where(*filtro_reserva)).first()
+        if fila is None:
+            return 0
+        quitar = fila.cantidad if cantidad is None else min(cantidad, fila.cantidad)
+        # Se repite el filtro: una condición como "expira < ahora" se vuelve a
+        # comprobar en la misma sentencia que borra.
+        guarda = (R.id == fila.id, R.cantidad == fila.cantidad, *filtro_reserva)
+        if quitar == fila.cantidad:
+            hecho = sesion.execute(delete(R).where(*guarda)).rowcount
+        else:
+            hecho = sesion.execute(update(R).where(*guarda).values(cantidad=R.cantidad - quitar)).rowcount
+        if not hecho:
+            return 0  # la tocó otro (barrido u otra petición): ya no es nuestra
+        sesion.execute(update(S).where(S.id_producto == id_producto)
+                       .values(reservada=S.reservada - quitar))
+        return quitar
+
+    def liberar(self, id_usuario, id_producto, cantidad=None):
+        """Devuelve `cantidad` unidades reservadas (todas si None) y hace commit."""
+        R = self.Reserva
+        liberadas = self._quitar((R.id_usuario == id_usuario, R.id_producto == id_producto),
+                                 id_producto, cantidad)
+        self.db.session.commit()
+        return liberadas
+
+    def liberar_todo(self, id_usuario):
+        R = self.Reserva
+        productos = self.db.session.execute(
+            select(R.id_producto).where(R.id_usuario == id_usuario).order_by(R.id_producto)).scalars().all()
+        for id_producto in productos:
+            self._quitar((R.id_usuario == id_usuario, R.id_producto == id_producto), id_producto, None)
+        self.db.session.commit()
+
+    # ---------------------------
+    # Checkout
+    # ---------------------------
+    def confirmar(self, id_usuario, pedido):
+        """Descuenta `pedido` (id_producto -> cantidad) en la transacción en curso.
+
+        Consume las reservas del usuario y toma de lo disponible lo que falte.
+        No hace commit. Devuelve la lista de productos sin stock suficiente;
+        si no está vacía quien llama debe hacer rollback.
+        """
+        S, R = self.Stock, self.Reserva
+        sesion = self.db.session
+        faltantes = []
+        # Orden fijo por id: dos checkouts bloquean filas en el mismo orden
+        for id_producto in sorted(pedido):
+            cantidad = pedido[id_producto]
+            propia = sesion.execute(select(R.id, R.cantidad).where(
+                R.id_usuario == id_usuario, R.id_producto == id_producto)).first()
+            reservada = 0
+            if propia is not None and sesion.execute(
+                    delete(R).where(R.id == propia.id, R.cantidad == propia.cantidad)).rowcount:
+                reservada = propia.cantidad
+            # Libera lo reservado y descuenta lo vendido en una sola sentencia;
+            # la condición exige que lo libre (contando lo propio) alcance.
+            hecho = sesion.execute(
+                update(S).where(S.id_producto == id_producto,
+                                S.cantidad - (S.reservada - reservada) >= cantidad)
+                .values(cantidad=S.cantidad - cantidad, reservada=S.reservada - reservada)).rowcount
+            if not hecho and self._controlado(id_producto):
+                faltantes.append(id_producto)
+        return faltantes
+
+    # ---------------------------
+    # Barrido
+    # ---------------------------
+    def barrer(self, lote=LOTE_BARRIDO):
+        """Libera reservas vencidas; devuelve cuántas liberó."""
+        R = self.Reserva
+        sesion = self.db.session
+        total = 0
+        while True:
+            ahora = datetime.utcnow()
+            vencidas = sesion.execute(
+                select(R.id, R.id_producto).where(R.expira < ahora).order_by(R.id_producto).limit(lote)).all()
+            liberadas = 0
+            for fila in vencidas:
+                # Si el usuario la renovó mientras tanto, expira < ahora ya no se cumple
+                if self._quitar((R.id == fila.id, R.expira < ahora), fila.id_producto, None):
+                    liberadas += 1
+            sesion.commit()
+            total += liberadas
+            if len(vencidas) < lote:
+                return total
+
+    # ---------------------------
+    # Administración
+    # ---------------------------
+    def _fijar(self, id_producto, cantidad):
+        S = self.Stock
+        sesion = self.db.session
+        if not sesion.execute(update(S).where(S.id_producto == id_producto).values(cantidad=cantidad)).rowcount:
+            sesion.add(S(id_producto=id_producto, cantidad=cantidad, reservada=0))
+
+    def fijar(self, id_producto, cantidad):
+        """Fija las unidades en depósito (las reservas vivas se mantienen)."""
+        self._fijar(id_producto, cantidad)
+        self.db.session.commit()
+
+    def disponibles(self):
+        return {s.id_producto: (s.cantidad, s.reservada) for s in self.db.session.query(self.Stock)}
+
+    # ---------------------------
+    # Inventario de consola
+    # ---------------------------
+    def sincronizar_inventario(self, inventario=None):
+        """Copia las cantidades del inventario de consola; devuelve id -> cantidad."""
+        inventario = inventario or self.inventario
+        if inventario is None:
+            return {}
+        S = self.Stock
+        sesion = self.db.session
+        # Primero se bloquean las filas (por id, como confirmar) y después se
+        # lee el inventario. Un checkout descuenta el inventario con sus filas
+        # ya bloqueadas, así que termina antes o espera: nunca se copia una
+        # cantidad leída antes de su descuento. Mismo orden web -> inventario
+        # en los dos caminos, sin interbloqueos.
+        for id_producto in sorted(inventario.vinculados()):
+            sesion.execute(update(S).where(S.id_producto == id_producto).values(cantidad=S.cantidad))
+        try:
+            cantidades = inventario.cantidades()
+            for id_producto, cantidad in cantidades.items():
+                self._fijar(id_producto, cantidad)
+        except BaseException:
+            sesion.rollback()
+            raise
+        sesion.commit()
+        return cantidades
+
+    def descontar_inventario(self, pedido):
+        """Descuenta `pedido` del inventario vinculado; False si no alcanza."""
+        return self.inventario is None or self.inventario.ajustar(pedido, -1)
+
+    def devolver_inventario(self, pedido):
+        if self.inventario is None:
+            return
+        try:
+            self.inventario.ajustar(pedido, 1)
+        except InventarioOcupado:
+            logger.exception("no se pudieron devolver al inventario las unidades de %s", pedido)
+
+
+class InventarioConsola:
+    """Base de inventory_app.py vinculada al catálogo web por nombre de producto.
+
+    Cada hilo de cada proceso abre su Inventario la primera vez y lo reusa (las
+    conexiones SQLite no cruzan hilos ni un fork). Nunca crea una base vacía si
+    la ruta no existe. Un bloqueo de la consola se convierte en
+    InventarioOcupado tras ESPERA_INVENTARIO_MS.
+    """
+
+    def __init__(self, ruta, catalogo):
+        self.ruta = ruta
+        self.catalogo = catalogo
+        self._ids = None  # id del catálogo web -> id en el inventario
+        self._local = threading.local()
+
+    def _inventario(self):
+        if getattr(self._local, "pid", None) != os.getpid():
+            if not os.path.isfile(self.ruta):
+                raise FileNotFoundError(f"No existe el inventario {self.ruta}")
+            from inventory_app import Inventario
+
+            inv = Inventario(self.ruta, perezoso=True)
+            inv.conn.execute(f"PRAGMA busy_timeout = {ESPERA_INVENTARIO_MS}")
+            self._local.inv, self._local.pid = inv, os.getpid()
+        return self._local.inv
+
+    @contextmanager
+    def _usar(self):
+        try:
+            yield self._inventario()
+        except sqlite3.OperationalError as e:
+            raise InventarioOcupado(str(e)) from e
+
+    def cantidades(self):
+        """id del catálogo web -> unidades en el inventario (solo los vinculados)."""
+        ids, cantidades = {}, {}
+        with self._usar() as inv:
+            for producto in self.catalogo:
+                nombre = producto["nombre"].lower()
+                for p in inv.buscar_por_nombre(producto["nombre"]):
+                    if p.nombre.lower() == nombre:
+                        ids[producto["id_producto"]] = p.id
+                        cantidades[producto["id_producto"]] = p.cantidad
+                        break
+        self._ids = ids
+        return cantidades
+
+    def vinculados(self):
+        """ids del catálogo web que tienen producto en el inventario."""
+        if self._ids is None:
+            self.cantidades()
+        return set(self._ids)
+
+    def ajustar(self, pedido, signo):
+        """Suma signo * cantidad de `pedido` (id web -> cantidad), todo o nada."""
+        vinculados = self.vinculados()
+        ajustes = {self._ids[i]: signo * q for i, q in pedido.items() if i in vinculados}
+        if not ajustes:
+            return True
+        with self._usar() as inv:
+            return inv.ajustar_stock_lote(ajustes) is not None
+
+
+class _Barrendero(threading.Thread):
+    def __init__(self, app, motor, intervalo):
+        super().__init__(name="barrido-reservas", daemon=True)
+        self.app = app
+        self.motor = motor
+        self.intervalo = intervalo
+        self.parar = threading.Event()
+
+    def run(self):
+        while not self.parar.wait(self.intervalo):
+            try:
+                with self.app.app_context():
+                    n = self.motor.barrer()
+                    self.motor.sincronizar_inventario()
+                if n:
+                    logger.info("%d reservas vencidas liberadas", n)
+            except Exception:
+                logger.exception("fallo el barrido de reservas")
+
+
+def _config(app, clave, defecto):
+    return int(app.config.get(clave, os.environ.get(clave, defecto)))
+
+
+def init_reservas(app, motor, catalogo=()):
+    motor.ttl = _config(app, "RESERVA_TTL_SEGUNDOS", TTL_RESERVA)
+    intervalo = _config(app, "RESERVA_BARRIDO_SEGUNDOS", INTERVALO_BARRIDO)
+    ruta_inventario = app.config.get("INVENTARIO_DB", os.environ.get("INVENTARIO_DB", ""))
+    if ruta_inventario and os.path.isfile(ruta_inventario):
+        motor.inventario = InventarioConsola(ruta_inventario, catalogo)
+    elif ruta_inventario:
+        logger.warning("INVENTARIO_DB=%s no existe: el stock web no se vincula con la consola",
+                       ruta_inventario)
+    app.extensions["reservas"] = motor
+    barrido = {"pid": None}
+
+    if intervalo > 0:
+        @app.before_request
+        def _arrancar_barrido():
+            # Un hilo por proceso, creado en la primera petición: así cada
+            # worker de servidor.py tiene el suyo (los hilos no cruzan un fork).
+            if barrido["pid"] != os.getpid():
+                barrido["pid"] = os.getpid()
+                _Barrendero(app, motor, intervalo).start()
+
+    @app.cli.group("stock")
+    def grupo():
+        """Stock y reservas del catálogo web."""
+
+    @grupo.command("fijar")
+    @click.argument("id_producto", type=int)
+    @click.argument("cantidad", type=int)
+    def fijar(id_producto, cantidad):
+        """Fija las unidades en depósito de un producto."""
+        motor.fijar(id_producto, cantidad)
+        click.echo(f"✔ Producto {id_producto}: {cantidad} unidades")
+
+    @grupo.command("importar")
+    @click.option("--inventario", "ruta", type=click.Path(exists=True, dir_okay=False),
+                  help="Base SQLite de inventory_app.py (por defecto INVENTARIO_DB).")
+    def importar(ruta):
+        """Copia ahora las cantidades del inventario de consola (por nombre de producto)."""
+        if ruta is not None:
+            inventario = InventarioConsola(ruta, catalogo)
+        elif motor.inventario is not None:
+            inventario = motor.inventario
+        else:
+            raise click.UsageError("No hay inventario vinculado; indicar la base con "
+                                   "--inventario o INVENTARIO_DB")
+        cantidades = motor.sincronizar_inventario(inventario)
+        for producto in catalogo:
+            if producto["id_producto"] in cantidades:
+                click.echo(f"✔ {producto['nombre']}: {cantidades[producto['id_producto']]} unidades")
+            else:
+                click.echo(f"  – {producto['nombre']}: no está en el inventario")
+
+    @grupo.command("barrer")
+    def barrer():
+        """Libera ahora las reservas vencidas."""
+        click.echo(f"✔ {motor.barrer()} reservas liberadas")
+
+    @grupo.command("ver")
+    def ver():
+        """Unidades en depósito, reservadas y disponibles."""
+        for id_producto, (cantidad, reservada) in sorted(motor.disponibles().items()):
+            click.echo(f"  {id_producto:>6}  depósito={cantidad:<6} reservada={reservada:<6} "
+                       f"disponible={cantidad - reservada}")
+
+    return motor
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+
+"""
+Resúmenes de ventas mantenidos de forma incremental
+----------------------------------------------------
+Tres tablas acumuladas (por día, por producto y por usuario) que
+finalizar_compra actualiza dentro de su misma transacción. Los reportes
+leen una fila por clave en lugar de recorrer compras + detalle_compra.
+
+- ResumenVentas.registrar(compra, detalles): suma una compra a los
+  resúmenes; no hace commit (lo hace quien llama, junto con la compra).
+- ResumenVentas.reconstruir(): backfill completo desde las tablas crudas
+  (calientes y de archivo).
+- ResumenVentas.conciliar(): compara resúmenes contra un recálculo y
+  devuelve las diferencias (lista vacía si cuadran).
+
+Comandos (flask --app app ...):
+    ventas reconstruir       # backfill
+    ventas conciliar         # sale con código 1 si hay diferencias
+
+Endpoint GET /admin/ventas (solo emails en ADMIN_EMAILS, separados por coma):
+    ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD&top=10&usuario=<id>
+"""
+
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+import click
+from flask import abort, jsonify, request
+from flask_login import current_user, login_required
+from sqlalchemy import func, insert, select, union_all, update
+from sqlalchemy.exc import IntegrityError
+
+TOLERANCIA = 0.005  # medio centavo: los importes son Float
+MAX_DIAS_REPORTE = 366
+MAX_TOP = 100
+
+
+class ResumenVentas:
+    def __init__(self, db, compra, detalle, diaria, producto, usuario, archivo=None):
+        self.db = db
+        self.Compra = compra
+        self.DetalleCompra = detalle
+        # (compra, detalle) de las tablas de archivo, que también cuentan al recalcular
+        self.archivo = archivo
+        self.VentaDiaria = diaria
+        self.VentaProducto = producto
+        self.VentaUsuario = usuario
+
+    # ---------------------------
+    # Mantenimiento incremental
+    # ---------------------------
+    def _sumar(self, modelo, clave, incrementos, inicial):
+        """UPDATE col = col + delta; si la fila no existe, INSERT.
+
+        Si otra transacción inserta la misma clave a la vez, el INSERT falla
+        dentro de un SAVEPOINT y se reintenta el UPDATE, que ya encuentra fila.
+        """
+        sesion = self.db.session
+        filtro = [getattr(modelo, k) == v for k, v in clave.items()]
+        valores = {k: getattr(modelo, k) + v for k, v in incrementos.items()}
+        valores.update({k: v for k, v in inicial.items() if k not in incrementos})
+        sentencia = update(modelo).where(*filtro).values(**valores)
+        if sesion.execute(sentencia).rowcount:
+            return
+        try:
+            with sesion.begin_nested():
+                sesion.execute(insert(modelo).values(**clave, **incrementos, **inicial))
+        except IntegrityError:
+            sesion.execute(sentencia)
+
+    def registrar(self, compra, detalles):
+        """Suma `compra` a los resúmenes en la transacción en curso.
+
+        Orden fijo (día, productos por id, usuario) para que dos checkouts
+        concurrentes bloqueen filas en el mismo orden y no se interbloqueen.
+        """
+        unidades = sum(d.cantidad for d in detalles)
+        fecha = compra.fecha or datetime.utcnow()
+        self._sumar(self.VentaDiaria, {"fecha": fecha.date()},
+                    {"compras": 1, "unidades": unidades, "ingresos": compra.total}, {})
+
+        por_producto = {}
+        for d in detalles:
+            acumulado = por_producto.setdefault(d.id_producto, [d.nombre_producto, 0, 0.0])
+            acumulado[1] += d.cantidad
+            acumulado[2] += d.precio * d.cantidad
+        for id_producto in sorted(por_producto):
+            nombre, cantidad, ingresos = por_producto[id_producto]
+            self._sumar(self.VentaProducto, {"id_producto": id_producto},
+                        {"compras": 1, "unidades": cantidad, "ingresos": ingresos},
+                        {"nombre_producto": nombre})
+
+        self._sumar(self.VentaUsuario, {"id_usuario": compra.id_usuario},
+                    {"compras": 1, "unidades": unidades, "total": compra.total},
+                    {"ultima_compra": fecha})
+
+    # ---------------------------
+    # Recalculo desde las tablas crudas
+    # ---------------------------
+    def _fuentes(self):
+        pares = [(self.Compra, self.DetalleCompra)]
+        if self.archivo:
+            pares.append(self.archivo)
+        compras = [select(c.id_compra, c.id_usuario, c.fecha, c.total) for c, _ in pares]
+        detalles = [select(d.id_compra, d.id_producto, d.nombre_producto, d.cantidad, d.precio)
+                    for _, d in pares]
+        if len(pares) == 1:
+            return compras[0].subquery("c"), detalles[0].subquery("d")
+        return union_all(*compras).subquery("c"), union_all(*detalles).subquery("d")
+
+    def _agregados(self):
+        """Las consultas caras que los resúmenes evitan; solo para backfill y conciliación."""
+        compras, detalles = self._fuentes()
+        C, D = compras.c, detalles.c
+        unidades_compra = (select(D.id_compra, func.sum(D.cantidad).label("unidades"))
+                           .group_by(D.id_compra).subquery())
+        unidades = func.coalesce(func.sum(unidades_compra.c.unidades), 0)
+        dia = func.date(C.fecha)
+        por_dia = (select(dia.label("fecha"), func.count(C.id_compra).label("compras"),
+                          unidades.label("unidades"), func.sum(C.total).label("ingresos"))
+                   .select_from(compras)
+                   .outerjoin(unidades_compra, unidades_compra.c.id_compra == C.id_compra)
+                   .group_by(dia))
+        por_producto = (select(D.id_producto, func.max(D.nombre_producto).label("nombre_producto"),
+                               func.count(func.distinct(D.id_compra)).label("compras"),
+                               func.sum(D.cantidad).label("unidades"),
+                               func.sum(D.precio * D.cantidad).label("ingresos"))
+                        .select_from(detalles)
+                        .group_by(D.id_producto))
+        por_usuario = (select(C.id_usuario, func.count(C.id_compra).label("compras"),
+                              unidades.label("unidades"), func.sum(C.total).label("total"),
+                              func.max(C.fecha).label("ultima_compra"))
+                       .select_from(compras)
+                       .outerjoin(unidades_compra, unidades_compra.c.id_compra == C.id_compra)
+                       .group_by(C.id_usuario))
+        return por_dia, por_producto, por_usuario
+
+    def reconstruir(self):
+        """Vacía los resúmenes y los rellena desde compras/detalle_compra en una transacción."""
+        sesion = self.db.session
+        por_dia, por_producto, por_usuario = self._agregados()
+        filas = {}
+        for modelo, consulta in ((self.VentaDiaria, por_dia), (self.VentaProducto, por_producto),
+                                 (self.VentaUsuario, por_usuario)):
+            sesion.query(modelo).delete(synchronize_session=False)
+            datos = [dict(f._mapping) for f in sesion.execute(consulta)]
+            if modelo is self.VentaDiaria:
+                for d in datos:
+                    d["fecha"] = _como_fecha(d["fecha"])
+            if datos:
+                sesion.execute(insert(modelo), datos)
+            filas[modelo.__tablename__] = len(datos)
+        sesion.commit()
+        return filas
+
+    def conciliar(self):
+        """Lista de (tabla, clave, columna, resumen, recalculado) que no cuadran."""
+        sesion = self.db.session
+        diferencias = []
+        por_dia, por_producto, por_usuario = self._agregados()
+        casos = (
+            (self.VentaDiaria, por_dia, "fecha", ("compras", "unidades", "ingresos")),
+            (self.VentaProducto, por_producto, "id_producto", ("compras", "unidades", "ingresos")),
+            (self.VentaUsuario, por_usuario, "id_usuario", ("compras", "unidades", "total")),
+        )
+        for modelo, consulta, clave, columnas in casos:
+            esperado = {}
+            for f in sesion.execute(consulta):
+                fila = f._mapping
+                k = _como_fecha(fila[clave]) if clave == "fecha" else fila[clave]
+                esperado[k] = fila
+            actual = {getattr(r, clave): r for r in sesion.query(modelo)}
+            for k in sorted(set(esperado) | set(actual), key=str):
+                for col in columnas:
+                    a = getattr(actual[k], col) if k in actual else 0
+                    e = esperado[k][col] if k in esperado else 0
+                    if abs(float(a or 0) - float(e or 0)) > TOLERANCIA:
+                        diferencias.append((modelo.__tablename__, k, col, a, e))
+        return diferencias
+
+    # ---------------------------
+    # Reportes (solo leen resúmenes)
+    # ---------------------------
+    def por_dia(self, desde, hasta):
+        V = self.VentaDiaria
+        filas = (V.query.filter(V.fecha >= desde, V.fecha <= hasta).order_by(V.fecha).all())
+        return [{"fecha": f.fecha.isoformat(), "compras": f.compras, "unidades": f.unidades,
+                 "ingresos": round(f.ingresos, 2)} for f in filas]
+
+    def top_productos(self, n):
+        V = self.VentaProducto
+        filas = V.query.order_by(V.unidades.desc(), V.id_producto).limit(n).all()
+        return [{"id_producto": f.id_producto, "nombre": f.nombre_producto, "compras": f.compras,
+                 "unidades": f.unidades, "ingresos": round(f.ingresos, 2)} for f in filas]
+
+    def de_usuario(self, id_usuario):
+        f = self.db.session.get(self.VentaUsuario, id_usuario)
+        if f is None:
+            return {"id_usuario": id_usuario, "compras": 0, "unidades": 0, "total": 0.0,
+                    "ultima_compra": None}
+        return {"id_usuario": f.id_usuario, "compras": f.compras, "unidades": f.unidades,
+                "total": round(f.total, 2),
+                "ultima_compra": f.ultima_compra.isoformat() if f.ultima_compra else None}
+
+
+def _como_fecha(valor):
+    # func.date() devuelve date en MySQL y texto 'AAAA-MM-DD' en SQLite
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor))
+
+
+def _admins(app):
+    valor = app.config.get("ADMIN_EMAILS", os.environ.get("ADMIN_EMAILS", ""))
+    if isinstance(valor, str):
+        valor = valor.split(",")
+    return {e.strip().lower() for e in valor if e.strip()}
+
+
+def _fecha_param(nombre, defecto):
+    valor = request.args.get(nombre)
+    if not valor:
+        return defecto
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        abort(400, f"{nombre} debe tener formato AAAA-MM-DD")
+
+
+def init_resumen_ventas(app, resumen):
+    app.extensions["resumen_ventas"] = resumen
+
+    @app.cli.group("ventas")
+    def ventas():
+        """Resúmenes de ventas."""
+
+    @ventas.command("reconstruir")
+    def reconstruir():
+        """Recalcula los resúmenes desde compras y detalle_compra."""
+        filas = resumen.reconstruir()
+        for tabla, n in filas.items():
+            click.echo(f"✔ {tabla}: {n} filas")
+
+    @ventas.command("conciliar")
+    def conciliar():
+        """Compara los resúmenes con un recálculo completo."""
+        diferencias = resumen.conciliar()
+        for tabla, clave, columna, actual, esperado in diferencias:
+            click.echo(f"✘ {tabla}[{clave}].{columna}: resumen={actual} recalculado={esperado}")
+        if diferencias:
+            sys.exit(1)
+        click.echo("✔ Los resúmenes cuadran con compras y detalle_compra")
+
+    @app.route("/admin/ventas", endpoint="admin_ventas")
+    @login_required
+    def admin_ventas():
+        if current_user.email.lower() not in _admins(app):
+            abort(403)
+        hasta = _fecha_param("hasta", datetime.utcnow().date())
+        desde = _fecha_param("desde", hasta - timedelta(days=29))
+        if desde > hasta or (hasta - desde).days >= MAX_DIAS_REPORTE:
+            abort(400, f"El rango debe ser de 1 a {MAX_DIAS_REPORTE} días")
+        top = max(1, min(request.args.get("top", 10, type=int), MAX_TOP))
+        reporte = {"desde": desde.isoformat(), "hasta": hasta.isoformat(),
+                   "por_dia": resumen.por_dia(desde, hasta),
+                   "top_productos": resumen.top_productos(top)}
+        usuario = request.args.get("usuario", type=int)
+        if usuario is not None:
+            reporte["usuario"] = resumen.de_usuario(usuario)
+        return jsonify(reporte)
+
+    return resumen
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Servidor de producción con pre-fork
+------------------------------------
+El proceso maestro crea la app una sola vez (create_app + precargar: plantillas
+compiladas, grilla del catálogo ya renderizada), abre el socket y hace fork de
+N workers. Los workers comparten esa memoria copy-on-write y aceptan
+conexiones del mismo socket, así que se usan N núcleos sin el modo debug de
+app.run(). Al compartir la app también comparten la secret_key: una sesión
+abierta en un worker sirve en cualquier otro.
+
+- Un worker que muere se reemplaza.
+- Con --max-peticiones un worker sale solo tras atender N peticiones (más un
+  margen al azar para que no se reciclen todos a la vez) y se reemplaza.
+- SIGHUP: reinicio elegante; los workers terminan la petición en curso y
+  salen, y el maestro levanta otros nuevos.
+- SIGTERM / SIGINT: parada elegante de todo.
+
+Requiere os.fork (Linux/macOS). En Windows usar `python app.py`.
+
+Uso:
+    python servidor.py --puerto 8000 --workers 4 --max-peticiones 10000
+    kill -HUP <pid del maestro>        # reiniciar workers
+
+Variables de entorno equivalentes: SERVIDOR_HOST, SERVIDOR_PUERTO,
+SERVIDOR_WORKERS, SERVIDOR_MAX_PETICIONES.
+"""
+
+import argparse
+import gc
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+from werkzeug.serving import make_server
+
+from app import create_app, db, precargar
+
+ESPERA_PARADA = 30.0  # segundos antes de matar a un worker que no termina
+INTERVALO_ACCEPT = 0.5  # cada cuánto un worker ocioso revisa si debe salir
+MARGEN_RECICLAJE = 0.1  # hasta +10 % de peticiones al azar antes de reciclar
+
+logger = logging.getLogger("servidor")
+
+
+# ---------------------------
+# Worker
+# ---------------------------
+def _worker(app, sock, max_peticiones):
+    salir = False
+
+    def _parar(signum, frame):
+        nonlocal salir
+        salir = True
+
+    signal.signal(signal.SIGTERM, _parar)
+    signal.signal(signal.SIGHUP, _parar)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C lo gestiona el maestro
+
+    # Las conexiones del pool no pueden cruzar un fork: cada worker abre las suyas
+    with app.app_context():
+        db.engine.dispose(close=False)
+    random.seed()
+
+    atendidas = 0
+
+    def contar(environ, start_response):
+        # handle_request() no dice si atendió algo o venció el timeout
+        nonlocal atendidas
+        atendidas += 1
+        return app(environ, start_response)
+
+    host, puerto = sock.getsockname()[:2]
+    servidor = make_server(host, puerto, contar, fd=sock.fileno())
+    servidor.timeout = INTERVALO_ACCEPT
+    limite = None
+    if max_peticiones:
+        limite = max_peticiones + random.randint(0, int(max_peticiones * MARGEN_RECICLAJE))
+    while not salir and (limite is None or atendidas < limite):
+        servidor.handle_request()  # vuelve tras una petición o tras el timeout
+    os._exit(0)
+
+
+# ---------------------------
+# Maestro
+# ---------------------------
+class Maestro:
+    def __init__(self, app, host, puerto, workers, max_peticiones):
+        self.app = app
+        self.workers = workers
+        self.max_peticiones = max_peticiones
+        self.hijos = {}  # pid -> momento de inicio
+        self.reiniciar = False
+        self.parar = False
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, puerto))
+        self.sock.listen(128)
+
+    @property
+    def direccion(self):
+        return self.sock.getsockname()
+
+    def _lanzar(self):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _worker(self.app, self.sock, self.max_peticiones)
+            finally:
+                os._exit(1)
+        self.hijos[pid] = time.monotonic()
+        return pid
+
+    def _senal(self, pids, signum):
+        for pid in pids:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _recoger(self):
+        """Recoge workers terminados sin bloquear; devuelve cuántos salieron."""
+        salidos = 0
+        while self.hijos:
+            try:
+                pid, estado = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.hijos.clear()
+                break
+            if pid == 0:
+                break
+            if self.hijos.pop(pid, None) is not None:
+                salidos += 1
+                codigo = os.waitstatus_to_exitcode(estado)
+                if codigo != 0 and not self.parar:
+                    logger.warning("worker %s terminó con código %s; se reemplaza", pid, codigo)
+        return salidos
+
+    def _reiniciar_workers(self):
+        # Primero se levantan los nuevos y luego se despide a los viejos: el
+        # socket nunca queda sin nadie que acepte conexiones.
+        viejos = list(self.hijos)
+        for _ in range(self.workers):
+            self._lanzar()
+        self._senal(viejos, signal.SIGTERM)
+        logger.info("reinicio: %d workers nuevos, %d despedidos", self.workers, len(viejos))
+
+    def _detener(self):
+        self._senal(list(self.hijos), signal.SIGTERM)
+        limite = time.monotonic() + ESPERA_PARADA
+        while self.hijos and time.monotonic() < limite:
+            self._recoger()
+            time.sleep(0.05)
+        self._senal(list(self.hijos), signal.SIGKILL)
+        while self.hijos:
+            self._recoger()
+            time.sleep(0.01)
+        self.sock.close()
+
+    def correr(self):
+        def _hup(signum, frame):
+            self.reiniciar = True
+
+        def _term(signum, frame):
+            self.parar = True
+
+        signal.signal(signal.SIGHUP, _hup)
+        signal.signal(signal.SIGTERM, _term)
+        signal.signal(signal.SIGINT, _term)
+
+        # Lo creado hasta aquí (app, plantillas, catálogo) no cambia: se saca
+        # del recolector para que no toque esas páginas y rompa el copy-on-write.
+        gc.freeze()
+        for _ in range(self.workers):
+            self._lanzar()
+        logger.info("maestro %d escuchando en %s:%d con %d workers",
+                    os.getpid(), *self.direccion, self.workers)
+
+        while not self.parar:
+            if self.reiniciar:
+                self.reiniciar = False
+                self._reiniciar_workers()
+            self._recoger()
+            # Reemplaza los que salieron (reciclados o caídos); durante un
+            # reinicio los viejos siguen contando hasta que terminan.
+            while len(self.hijos) < self.workers and not self.parar:
+                self._lanzar()
+            time.sleep(0.1)
+        self._detener()
+        logger.info("maestro detenido")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--host", default=os.environ.get("SERVIDOR_HOST", "127.0.0.1"))
+    parser.add_argument("--puerto", type=int, default=int(os.environ.get("SERVIDOR_PUERTO", 8000)))
+    parser.add_argument("--workers", type=int,
+                        default=int(os.environ.get("SERVIDOR_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--max-peticiones", type=int,
+                        default=int(os.environ.get("SERVIDOR_MAX_PETICIONES", 0)),
+                        help="reciclar cada worker tras N peticiones (0 = nunca)")
+    parser.add_argument("--log-accesos", action="store_true", help="una línea por petición")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("servidor.py necesita os.fork; en este sistema usar `python app.py`.")
+    logging.basicConfig(level=logging.INFO, format="[%(process)d] %(message)s")
+    if not args.log_accesos:
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    app = precargar(create_app())
+    Maestro(app, args.host, args.puerto, args.workers, args.max_peticiones).correr()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+"""
+GET condicional (ETag / Last-Modified)
+---------------------------------------
+Las vistas calculan un ETag barato (versión del catálogo, última compra del
+usuario, id de factura...) ANTES de tocar la base o renderizar y llaman a
+no_modificado(): si el cliente ya tiene esa versión se responde 304 sin
+cuerpo. Si no, la respuesta completa se marca con con_validadores().
+
+Las páginas son de usuario autenticado, así que se marcan "private, no-cache":
+el navegador guarda la copia pero revalida en cada recarga.
+
+Uso:
+    etag = hacer_etag("catalogo", CATALOGO_VERSION, idioma, huella_plantillas(app, "catalogo.html"))
+    respuesta = no_modificado(etag)
+    if respuesta is not None:
+        return respuesta
+    ...
+    return con_validadores(render_template(...), etag)
+"""
+
+import hashlib
+import json
+
+from flask import current_app, make_response, request
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def hacer_etag(*partes):
+    """ETag opaco a partir de partes cualesquiera (se convierten a str)."""
+    crudo = "\x1f".join(str(p) for p in partes).encode("utf-8")
+    return hashlib.sha1(crudo).hexdigest()[:20]
+
+
+def huella_plantillas(app, *nombres):
+    """Hash del fuente de las plantillas (y del manifest de assets).
+
+    Cambia con cada deploy que toque el HTML, así un ETag viejo no valida
+    una página que ahora se vería distinta. Se calcula una vez por proceso.
+    """
+    cache = app.extensions.setdefault("huellas_plantillas", {})
+    huella = cache.get(nombres)
+    if huella is None:
+        h = hashlib.sha1()
+        for nombre in nombres:
+            fuente, _, _ = app.jinja_env.loader.get_source(app.jinja_env, nombre)
+            h.update(fuente.encode("utf-8"))
+        manifest = app.extensions.get("assets_manifest") or {}
+        h.update(json.dumps(manifest, sort_keys=True).encode("utf-8"))
+        huella = cache[nombres] = h.hexdigest()[:12]
+    return huella
+
+
+def _sin_zona(fecha):
+    return fecha.replace(tzinfo=None, microsecond=0) if fecha is not None else None
+
+
+def no_modificado(etag, ultima_modificacion=None):
+    """Respuesta 304 si el cliente ya tiene `etag`; None si hay que generar la página.
+
+    If-None-Match manda sobre If-Modified-Since (RFC 9110 §13.2.2).
+    """
+    if request.if_none_match:
+        coincide = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and ultima_modificacion is not None:
+        coincide = _sin_zona(ultima_modificacion) <= _sin_zona(request.if_modified_since)
+    else:
+        coincide = False
+    if not coincide:
+        return None
+    respuesta = current_app.response_class(status=304)
+    return con_validadores(respuesta, etag, ultima_modificacion)
+
+
+def con_validadores(respuesta, etag, ultima_modificacion=None):
+    respuesta = make_response(respuesta)
+    respuesta.set_etag(etag)
+    if ultima_modificacion is not None:
+        respuesta.last_modified = ultima_modificacion
+    respuesta.headers["Cache-Control"] = CACHE_CONTROL
+    return respuesta